@@ -10,15 +10,75 @@ Aikido Local Scanner: https://www.aikido.dev/docs/local-scanner
 """
 
 import os
+import re
+import sys
+import logging
+import logging.handlers
+import time
+import uuid
+import signal
+import atexit
+import threading
 import subprocess
 import platform
 import shutil
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import json
 import asyncio
 
 
+# "<n> critical|high|medium|low|issue(s)" counts, matched in a single pass per line.
+# Case-insensitive so lines never need lowering just to be scanned.
+_COUNT_RE = re.compile(r'(\d+)\s+(critical|high|medium|low|issue)s?', re.IGNORECASE)
+_SEVERITIES = ('critical', 'high', 'medium', 'low')
+_SEVERITY_RE = re.compile('|'.join(_SEVERITIES), re.IGNORECASE)
+
+# Scanner progress goes to stderr (stdout carries the stdio MCP transport).
+# Per-line scanner output is logged at DEBUG and buffered; INFO and above
+# flush immediately. Set the 'aikido' logger to DEBUG to see scanner output.
+logger = logging.getLogger('aikido')
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_buffer = logging.handlers.MemoryHandler(
+    capacity=256,
+    flushLevel=logging.INFO,
+    target=logging.StreamHandler(sys.stderr)
+)
+_log_buffer.target.setFormatter(logging.Formatter('[Aikido] %(message)s'))
+logger.addHandler(_log_buffer)
+
+# Serializes the check/remove/start of the warm scanner container, so
+# concurrent scans can't remove a container another scan just started
+_container_lock = threading.Lock()
+_container_started = False  # set (and atexit cleanup registered) on first start
+
+# ARM64 hosts (Apple Silicon) need amd64 emulation for the Aikido scanner image
+_PLATFORM_FLAG = (
+    ['--platform', 'linux/amd64']
+    if platform.machine().lower() in ('arm64', 'aarch64')
+    else []
+)
+
+
+def _update_counts(line: str, severity_counts: Dict[str, int]) -> Optional[int]:
+    """
+    Update severity counts from one scanner output line.
+
+    Returns:
+        Total findings count if the line reports one, else None
+    """
+    findings_count = None
+    for match in _COUNT_RE.finditer(line):
+        count, kind = int(match.group(1)), match.group(2).lower()
+        if kind == 'issue':
+            if 'found' in line.lower():
+                findings_count = count
+        else:
+            severity_counts[kind] = count
+    return findings_count
+
+
 @dataclass
 class SecurityFinding:
     """Security vulnerability finding from Aikido"""
@@ -47,6 +107,19 @@ class AikidoScanner:
     SCANNER_IMAGE = "aikidosecurity/local-scanner:latest"
     SCANNER_VERSION = "1.0.109"
 
+    # Long-lived scanner container reused across scans (see _ensure_container)
+    CONTAINER_NAME = "aikido-scanner"
+    MOUNT_ROOT_LABEL = "codex-d.mount-root"
+    _scanner_entrypoint: Optional[List[str]] = None
+
+    SCAN_TIMEOUT = 900  # seconds
+    KILL_GRACE = 5  # seconds between SIGTERM and SIGKILL on timeout
+
+    # Successful Docker checks are reused across scanner instances for this long
+    DOCKER_VERIFY_TTL = 60.0  # seconds
+    _docker_verified: float = 0.0  # time.monotonic() of last successful check
+    STREAM_LIMIT = 1024 * 1024  # max bytes per scanner output line
+
     def __init__(self, api_key: Optional[str] = None):
         """
         Initialize Aikido scanner
@@ -67,8 +140,18 @@ class AikidoScanner:
         # Verify Docker availability
         self.verify_docker()
 
-        # Detect platform for Docker compatibility
-        self.platform_flag = self._get_platform_flag()
+        # Platform flag for Docker compatibility
+        self.platform_flag = _PLATFORM_FLAG
+
+        # Directory bind-mounted (read-only) once into the warm scanner
+        # container. Opt-in: without it, and for repositories outside of it,
+        # each scan mounts only its own repository in a one-shot `docker run`.
+        mount_root = os.getenv("AIKIDO_MOUNT_ROOT")
+        self.mount_root = os.path.abspath(mount_root) if mount_root else None
+
+        # Verbose scanner output is opt-in; the summary lines parsed below
+        # do not need it
+        self.debug = os.getenv("AIKIDO_DEBUG", "").lower() in ("1", "true", "yes")
 
     def verify_docker(self) -> bool:
         """
@@ -80,6 +163,10 @@ class AikidoScanner:
         Raises:
             DockerNotAvailableError: If Docker is not available
         """
+        cls = type(self)
+        if cls._docker_verified and time.monotonic() - cls._docker_verified < self.DOCKER_VERIFY_TTL:
+            return True
+
         # Check Docker CLI exists
         if not shutil.which('docker'):
             raise DockerNotAvailableError(
@@ -98,6 +185,7 @@ class AikidoScanner:
                 raise DockerNotAvailableError(
                     f"Docker daemon is not running. Error: {result.stderr}"
                 )
+            cls._docker_verified = time.monotonic()
             return True
 
         except subprocess.TimeoutExpired:
@@ -107,20 +195,198 @@ class AikidoScanner:
         except Exception as e:
             raise DockerNotAvailableError(f"Docker verification failed: {str(e)}")
 
-    def _get_platform_flag(self) -> List[str]:
+    def _get_scanner_entrypoint(self) -> List[str]:
+        """
+        Look up the scanner image's entrypoint so it can be invoked via `docker exec`.
+
+        The warm container is started with `sleep` as its entrypoint, so the
+        scanner binary has to be called explicitly.
+
+        Returns:
+            Entrypoint argv of the scanner image (empty if it cannot be determined)
+        """
+        cls = type(self)
+        if cls._scanner_entrypoint is None:
+            result = subprocess.run(
+                ['docker', 'image', 'inspect', '--format', '{{json .Config.Entrypoint}}', self.SCANNER_IMAGE],
+                capture_output=True,
+                timeout=10,
+                text=True
+            )
+            if result.returncode != 0:
+                # Image not pulled yet; let the next call retry
+                return []
+            cls._scanner_entrypoint = json.loads(result.stdout.strip() or "null") or []
+        return cls._scanner_entrypoint
+
+    def _ensure_container(self) -> bool:
         """
-        Determine platform flag for Docker compatibility.
+        Make sure the long-lived scanner container is running.
 
-        Returns ARM64 Macs need --platform linux/amd64 for Aikido scanner.
+        Starts `aikido-scanner` detached with `mount_root` bind-mounted
+        read-only at /code, so repeated scans skip image unpack and (on ARM64)
+        emulator startup.
 
         Returns:
-            List of Docker platform arguments
+            True if the warm container is available for `docker exec`
         """
-        machine = platform.machine().lower()
-        if machine in ['arm64', 'aarch64']:
-            # ARM64 Mac - need platform emulation
-            return ['--platform', 'linux/amd64']
-        return []
+        global _container_started
+        with _container_lock:
+            running = subprocess.run(
+                [
+                    'docker', 'ps', '-q',
+                    '--filter', f'name=^{self.CONTAINER_NAME}$',
+                    '--filter', f'label={self.MOUNT_ROOT_LABEL}={self.mount_root}'
+                ],
+                capture_output=True,
+                timeout=10,
+                text=True
+            )
+            if running.returncode == 0 and running.stdout.strip():
+                return True
+
+            # Drop a stopped container or one bound to a different mount root
+            subprocess.run(
+                ['docker', 'rm', '-f', self.CONTAINER_NAME],
+                capture_output=True,
+                timeout=30
+            )
+
+            started = subprocess.run(
+                [
+                    'docker', 'run', '-d',
+                    '--name', self.CONTAINER_NAME,
+                    '--label', f'{self.MOUNT_ROOT_LABEL}={self.mount_root}',
+                    *self.platform_flag,
+                    '-v', f'{self.mount_root}:/code:ro',
+                    '--entrypoint', 'sleep',
+                    self.SCANNER_IMAGE,
+                    'infinity'
+                ],
+                capture_output=True,
+                timeout=300,
+                text=True
+            )
+            if started.returncode != 0:
+                logger.warning("Could not start scanner container: %s", started.stderr.strip())
+                return False
+
+            if not _container_started:
+                atexit.register(_stop_container, self.CONTAINER_NAME)
+                _container_started = True
+            return True
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Stop and remove the warm scanner container, if this process started one."""
+        if _container_started:
+            await asyncio.to_thread(_stop_container, cls.CONTAINER_NAME)
+
+    def _build_scan_command(
+        self,
+        repo_path: str,
+        scan_args: List[str]
+    ) -> Tuple[List[str], str, Optional[str]]:
+        """
+        Build the Docker command for a scan.
+
+        Uses `docker exec` into the warm container when AIKIDO_MOUNT_ROOT is
+        set and the repository lives under it, otherwise a one-shot
+        `docker run --rm` that mounts only the repository.
+
+        Args:
+            repo_path: Absolute path to repository to scan
+            scan_args: Scanner arguments following the scan target
+
+        Returns:
+            Tuple of (Docker argv, name of the container running the scan,
+            pid file of the scanner inside the warm container or None)
+        """
+        under_root = False
+        if self.mount_root:
+            relative_path = os.path.relpath(repo_path, self.mount_root)
+            under_root = relative_path != os.pardir and not relative_path.startswith(os.pardir + os.sep)
+
+        if under_root:
+            entrypoint = self._get_scanner_entrypoint()
+            if entrypoint and self._ensure_container():
+                target = '/code' if relative_path == os.curdir else f"/code/{relative_path.replace(os.sep, '/')}"
+                # Record the scanner's pid inside the container while it runs,
+                # so a timeout can stop this scan without the shared container.
+                # The file is removed as soon as the scanner exits.
+                pid_file = f"/tmp/aikido-scan-{uuid.uuid4().hex[:12]}.pid"
+                wrapper = (
+                    f'"$@" & pid=$!; echo $pid > {pid_file}; '
+                    f'wait $pid; status=$?; rm -f {pid_file}; exit $status'
+                )
+                return [
+                    'docker', 'exec',
+                    '-e', f'AIKIDO_API_KEY={self.api_key}',
+                    self.CONTAINER_NAME,
+                    'sh', '-c', wrapper, 'sh',
+                    *entrypoint,
+                    'scan', target,
+                    *scan_args
+                ], self.CONTAINER_NAME, pid_file
+
+        container_name = f"aikido-scan-{uuid.uuid4().hex[:12]}"
+        return [
+            'docker', 'run', '--rm',
+            '--name', container_name,
+            *self.platform_flag,
+            '-v', f'{repo_path}:/code',
+            '-e', f'AIKIDO_API_KEY={self.api_key}',
+            self.SCANNER_IMAGE,
+            'scan', '/code',
+            *scan_args
+        ], container_name, None
+
+    async def _terminate_scan(
+        self,
+        process: asyncio.subprocess.Process,
+        container_name: str,
+        pid_file: Optional[str]
+    ) -> None:
+        """
+        Stop a running scan: SIGTERM the docker client's process group, then
+        SIGKILL after KILL_GRACE seconds, and finally stop the scanner itself
+        (killing the client alone leaves it running). One-shot containers are
+        killed; in the shared warm container only this scan's process is, and
+        only while its pid file shows it is still running.
+        """
+        if process.returncode is None:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+            try:
+                await asyncio.wait_for(process.wait(), timeout=self.KILL_GRACE)
+            except asyncio.TimeoutError:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+
+        if pid_file:
+            # The wrapper removes the pid file once the scanner exits, so a
+            # present file still names this scan
+            stop_cmd = [
+                'docker', 'exec', container_name, 'sh', '-c',
+                f'pid=$(cat {pid_file} 2>/dev/null) || exit 0; kill -TERM "$pid"; '
+                f'i=0; while [ -f {pid_file} ] && [ $i -lt {self.KILL_GRACE} ]; '
+                f'do sleep 1; i=$((i + 1)); done; '
+                f'[ -f {pid_file} ] && kill -KILL "$pid"; exit 0'
+            ]
+        else:
+            stop_cmd = ['docker', 'kill', container_name]
+        killer = await asyncio.create_subprocess_exec(
+            *stop_cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        await killer.wait()
 
     async def scan_repository(
         self,
@@ -163,80 +429,92 @@ class AikidoScanner:
             repository_name = os.path.basename(repo_path)
 
         # Auto-detect git branch
-        try:
-            branch_result = subprocess.run(
-                ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
-                cwd=repo_path,
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            branch_name = branch_result.stdout.strip() if branch_result.returncode == 0 else 'main'
-        except Exception:
-            branch_name = 'main'  # Fallback to main
+        branch_name = _current_branch(repo_path)
 
-        print(f"[Aikido] Starting scan of {repo_path}")
-        print(f"[Aikido] Repository name: {repository_name}")
-        print(f"[Aikido] Branch name: {branch_name}")
-        print(f"[Aikido] Scan types: {', '.join(scan_types)}")
+        logger.info("Starting scan of %s", repo_path)
+        logger.info("Repository name: %s", repository_name)
+        logger.info("Branch name: %s", branch_name)
+        logger.info("Scan types: %s", ', '.join(scan_types))
 
-        # Build Docker command
-        cmd = [
-            'docker', 'run', '--rm',
-            *self.platform_flag,
-            '-v', f'{repo_path}:/code',
-            '-e', f'AIKIDO_API_KEY={self.api_key}',
-            self.SCANNER_IMAGE,
-            'scan', '/code',
+        # Scanner arguments following the scan target
+        scan_args = [
             '--repositoryname', repository_name,
             '--branchname', branch_name,
-            '--scan-types', *scan_types,
-            '--debug'
+            '--scan-types', *scan_types
         ]
+        if self.debug:
+            scan_args.append('--debug')
 
         # Execute Docker scanner
         try:
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+            # Build the command off the event loop (may start the warm container)
+            cmd, container_name, pid_file = await asyncio.to_thread(
+                self._build_scan_command, repo_path, scan_args
             )
 
-            # Stream output for progress tracking
+            # Own process group so a timeout can signal everything we spawned
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=self.STREAM_LIMIT,
+                start_new_session=True
+            )
+
+            # Drain stderr concurrently so a chatty scanner can't fill the pipe
+            stderr_task = asyncio.create_task(process.stderr.read())
+
+            # Stream output, updating counters as lines arrive
             findings_count = 0
-            output_lines = []
-
-            for line in process.stdout:
-                line = line.strip()
-                if line:
-                    print(f"[Aikido] {line}")
-                    output_lines.append(line)
-
-                    # Count findings in output
-                    if 'found' in line.lower() and 'issue' in line.lower():
-                        try:
-                            # Try to extract finding count from output
-                            import re
-                            match = re.search(r'(\d+)\s+issue', line)
-                            if match:
-                                findings_count = int(match.group(1))
-                        except:
-                            pass
+            severity_counts = dict.fromkeys(_SEVERITIES, 0)
+            findings = []
+
+            async def stream_output():
+                nonlocal findings_count
+                while True:
+                    try:
+                        raw_line = await process.stdout.readline()
+                    except (ValueError, asyncio.LimitOverrunError):
+                        # A scanner failure, not the invalid-path ValueError
+                        # that run_aikido_scan reports
+                        raise RuntimeError(
+                            f"Scanner output line exceeded {self.STREAM_LIMIT} bytes"
+                        ) from None
+                    if not raw_line:
+                        break
+                    line = raw_line.decode(errors='replace').strip()
+                    if line:
+                        logger.debug("%s", line)
+
+                        count = _update_counts(line, severity_counts)
+                        if count is not None:
+                            findings_count = count
+
+                        # Keep individual finding rows (table output)
+                        if '│' in line and _SEVERITY_RE.search(line):
+                            findings.append(line)
+                return await process.wait()
 
             # Wait for completion (15 minute timeout)
             try:
-                returncode = process.wait(timeout=900)
-            except subprocess.TimeoutExpired:
-                process.kill()
+                returncode = await asyncio.wait_for(stream_output(), timeout=self.SCAN_TIMEOUT)
+            except asyncio.TimeoutError:
+                await self._terminate_scan(process, container_name, pid_file)
+                stderr_task.cancel()
                 raise subprocess.TimeoutExpired(
-                    cmd, 900,
+                    cmd, self.SCAN_TIMEOUT,
                     "Scan exceeded 15 minute timeout. Try scanning a smaller directory."
                 )
+            except BaseException:
+                # Failed read or cancelled tool call: don't leave the scan running
+                await self._terminate_scan(process, container_name, pid_file)
+                stderr_task.cancel()
+                raise
+
+            stderr = (await stderr_task).decode(errors='replace')
 
             # Check for errors
             if returncode != 0:
-                stderr = process.stderr.read()
                 raise RuntimeError(
                     f"Aikido scanner failed with exit code {returncode}.\n"
                     f"Error: {stderr}\n"
@@ -246,93 +524,51 @@ class AikidoScanner:
                     f"  - Repository path is inaccessible"
                 )
 
-            # Parse results from output
-            results = self._parse_scan_output(output_lines, findings_count)
+            # Assemble results from the streamed counters
+            results = self._parse_scan_output(findings, findings_count, severity_counts)
 
-            print(f"[Aikido] Scan complete. Found {results['findings_count']} issues.")
+            logger.info("Scan complete. Found %d issues.", results['findings_count'])
 
             return results
 
         except Exception as e:
-            print(f"[Aikido] Scan error: {str(e)}")
+            logger.error("Scan error: %s", e)
             raise
+        finally:
+            _log_buffer.flush()
 
-    def _parse_scan_output(self, output_lines: List[str], findings_count: int) -> Dict:
+    def _parse_scan_output(
+        self,
+        finding_rows: List[str],
+        findings_count: int,
+        severity_counts: Dict[str, int]
+    ) -> Dict:
         """
-        Parse Aikido scanner console output into structured results.
+        Assemble structured results from counters collected while streaming.
 
         Note: Aikido scanner sends detailed results to cloud platform.
-        This parses the console output for summary information.
+        The console output only carries summary information.
 
         Args:
-            output_lines: Console output from scanner
+            finding_rows: Finding table rows seen in the scanner output
             findings_count: Number of findings detected
+            severity_counts: Per-severity counts detected
 
         Returns:
             Structured scan results
         """
-        # Extract severity counts from output
-        severity_counts = {
-            "critical": 0,
-            "high": 0,
-            "medium": 0,
-            "low": 0
-        }
-
-        findings = []
-
-        for line in output_lines:
-            line_lower = line.lower()
-
-            # Try to extract severity information
-            if 'critical' in line_lower:
-                try:
-                    import re
-                    match = re.search(r'(\d+)\s+critical', line_lower)
-                    if match:
-                        severity_counts['critical'] = int(match.group(1))
-                except:
-                    pass
-
-            if 'high' in line_lower:
-                try:
-                    import re
-                    match = re.search(r'(\d+)\s+high', line_lower)
-                    if match:
-                        severity_counts['high'] = int(match.group(1))
-                except:
-                    pass
-
-            if 'medium' in line_lower:
-                try:
-                    import re
-                    match = re.search(r'(\d+)\s+medium', line_lower)
-                    if match:
-                        severity_counts['medium'] = int(match.group(1))
-                except:
-                    pass
-
-            if 'low' in line_lower:
-                try:
-                    import re
-                    match = re.search(r'(\d+)\s+low', line_lower)
-                    if match:
-                        severity_counts['low'] = int(match.group(1))
-                except:
-                    pass
-
-            # Extract individual findings if present in output
-            if '│' in line and any(sev in line_lower for sev in ['critical', 'high', 'medium', 'low']):
-                # This looks like a finding row
-                findings.append({
-                    "severity": "unknown",
-                    "title": line.strip(),
-                    "description": "See Aikido platform for details",
-                    "file_path": "unknown",
-                    "line_number": None,
-                    "cwe_id": None,
-                    "remediation": "Check Aikido platform for remediation steps"
-                })
+        findings = [
+            {
+                "severity": "unknown",
+                "title": row,
+                "description": "See Aikido platform for details",
+                "file_path": "unknown",
+                "line_number": None,
+                "cwe_id": None,
+                "remediation": "Check Aikido platform for remediation steps"
+            }
+            for row in finding_rows
+        ]
 
         # If no detailed findings found, create summary entry
         if not findings and findings_count > 0:
@@ -371,6 +607,50 @@ class AikidoScanner:
         }
 
 
+def _current_branch(repo_path: str) -> str:
+    """
+    Current branch of a repository, read straight from .git/HEAD.
+
+    Only shells out to git when .git is not a plain directory (worktrees and
+    submodules use a pointer file). Falls back to 'main' if it can't be read.
+    """
+    git_dir = os.path.join(repo_path, '.git')
+    if os.path.isdir(git_dir):
+        try:
+            with open(os.path.join(git_dir, 'HEAD')) as f:
+                head = f.readline().strip()
+        except OSError:
+            return 'main'
+        if head.startswith('ref: refs/heads/'):
+            return head[len('ref: refs/heads/'):]
+        # Detached HEAD, same answer as `git rev-parse --abbrev-ref HEAD`
+        return 'HEAD'
+
+    try:
+        branch_result = subprocess.run(
+            ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
+            cwd=repo_path,
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        return branch_result.stdout.strip() if branch_result.returncode == 0 else 'main'
+    except Exception:
+        return 'main'  # Fallback to main
+
+
+def _stop_container(container_name: str) -> None:
+    """Stop and remove a scanner container, ignoring errors (used at interpreter exit)."""
+    try:
+        subprocess.run(
+            ['docker', 'rm', '-f', container_name],
+            capture_output=True,
+            timeout=30
+        )
+    except Exception:
+        pass
+
+
 async def run_aikido_scan(
     repo_path: str,
     repository_name: Optional[str] = None,
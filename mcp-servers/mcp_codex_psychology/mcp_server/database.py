@@ -2,222 +2,429 @@
 
 import sqlite3
 import json
+import time
+import queue
+import atexit
+import threading
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from contextlib import contextmanager
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is the fallback
+    orjson = None
+
 # Database path
 DB_PATH = Path(__file__).parent / "codex_psychology.db"
 
+# Applied once per connection when it is opened
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA cache_size=-65536",  # 64 MiB
+    "PRAGMA busy_timeout=5000",  # wait on another process's write lock instead of failing
+)
+
+# Read-only connections only need the read-side settings
+_READER_PRAGMAS = (
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MiB, shared with the writer via the OS page cache
+    "PRAGMA cache_size=-16384",  # 16 MiB each
+    "PRAGMA busy_timeout=5000",
+)
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a JSON column value, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
+
+
+_EMPTY_JSON = "{}"
+
+
+def _loads(data: str) -> Any:
+    """Parse a JSON value produced by SQLite, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Timestamps are generated by SQLite in the statement itself; same ISO-8601
+# local-time text the Python side used to produce (millisecond precision)
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')"
+
+# Shared connection, opened lazily and reused for the life of the process.
+# Access is serialized by _db_lock; nested get_db() blocks share one transaction.
+_conn: Optional[sqlite3.Connection] = None
+_db_lock = threading.RLock()
+_db_depth = 0
+_db_owner: Optional[int] = None  # thread holding the outermost get_db() block
+_write_gen = 0  # bumped whenever an outermost get_db() block ends
+
+# Pool of read-only connections for get_db(readonly=True). In WAL mode they
+# read concurrently with each other and with the writer above.
+_READ_POOL_SIZE = 4
+_read_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+_read_conns: List[sqlite3.Connection] = []
+_read_lock = threading.Lock()
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Open the shared connection on first use."""
+    global _conn
+    if _conn is None:
+        # Every statement in this module fits in the prepared-statement cache
+        conn = sqlite3.connect(str(DB_PATH), check_same_thread=False, cached_statements=512)
+        conn.row_factory = sqlite3.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        _conn = conn
+    return _conn
+
+
+def _acquire_reader() -> sqlite3.Connection:
+    """Take a read-only connection from the pool, opening one if under the limit."""
+    try:
+        return _read_pool.get_nowait()
+    except queue.Empty:
+        pass
+
+    with _read_lock:
+        if len(_read_conns) < _READ_POOL_SIZE:
+            # Make sure the writer has created the file and schema first
+            initialize_database()
+            conn = sqlite3.connect(
+                f"{DB_PATH.as_uri()}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                cached_statements=512
+            )
+            conn.row_factory = sqlite3.Row
+            for pragma in _READER_PRAGMAS:
+                conn.execute(pragma)
+            _read_conns.append(conn)
+            return conn
+
+    return _read_pool.get()
+
 
 @contextmanager
-def get_db():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+def get_db(conn: Optional[sqlite3.Connection] = None, readonly: bool = False):
+    """
+    Context manager for the shared database connection.
+
+    Commits when the outermost block exits and rolls back on error. Pass an
+    already-open `conn` to join the caller's transaction.
+
+    readonly=True borrows a pooled read-only connection instead, so reads
+    don't queue behind writers. Its statements see one consistent snapshot
+    of committed data. Inside an open write block on the same thread, the
+    writer is used so uncommitted changes stay visible.
+    """
+    global _db_depth, _db_owner, _write_gen
+    if readonly and conn is None and _db_owner != threading.get_ident():
+        reader = _acquire_reader()
+        try:
+            reader.execute("BEGIN")
+            yield reader
+        finally:
+            reader.rollback()
+            _read_pool.put(reader)
+        return
+
+    with _db_lock:
+        conn = conn or _get_connection()
+        _db_depth += 1
+        if _db_depth == 1:
+            _db_owner = threading.get_ident()
+        try:
+            yield conn
+            if _db_depth == 1:
+                conn.commit()
+        except Exception:
+            if _db_depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            if _db_depth == 1:
+                # Committed or rolled back: cached reads may now be stale
+                _write_gen += 1
+            _db_depth -= 1
+            if _db_depth == 0:
+                _db_owner = None
+
+
+def close_db():
+    """Close the shared connection and idle readers (reopened lazily on next use)."""
+    global _conn
+    with _read_lock:
+        while True:
+            try:
+                reader = _read_pool.get_nowait()
+            except queue.Empty:
+                break
+            reader.close()
+            _read_conns.remove(reader)
+
+    # Writer last, so its close can checkpoint and remove the WAL
+    with _db_lock:
+        if _conn is not None:
+            # Let SQLite refresh planner statistics it has flagged as stale
+            _conn.execute("PRAGMA optimize")
+            _conn.close()
+            _conn = None
+
+
+# Close cleanly at exit so the last connection checkpoints and removes the WAL
+atexit.register(close_db)
+
+
+# Bump whenever _SCHEMA changes; databases at an older version re-run it
+SCHEMA_VERSION = 2
+
+# Full schema, applied in a single executescript() call (one transaction).
+# Tables are STRICT (SQLite >= 3.37) so mistyped values are rejected on insert.
+# STRICT only applies when a table is created: databases from before it keep
+# their original non-STRICT tables (CREATE TABLE IF NOT EXISTS leaves them
+# alone), which accept the same rows, just without the type checks.
+_SCHEMA = f"""
+BEGIN;
+
+-- Repositories table
+CREATE TABLE IF NOT EXISTS repositories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo_path TEXT UNIQUE NOT NULL,
+    repo_name TEXT NOT NULL,
+    first_analyzed_at TEXT NOT NULL,
+    last_analyzed_at TEXT NOT NULL,
+    total_scans INTEGER DEFAULT 0
+) STRICT;
+
+-- Scans table (each enrichment run)
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo_id INTEGER NOT NULL,
+    scan_timestamp TEXT NOT NULL,
+    git_patterns_json TEXT NOT NULL,
+    total_commits_analyzed INTEGER NOT NULL,
+    severity REAL NOT NULL,
+    scan_duration_ms INTEGER,
+    FOREIGN KEY (repo_id) REFERENCES repositories (id)
+) STRICT;
+
+-- Issue flags table (recurring patterns with occurrence tracking)
+CREATE TABLE IF NOT EXISTS issue_flags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo_id INTEGER NOT NULL,
+    issue_type TEXT NOT NULL,
+    first_detected_at TEXT NOT NULL,
+    last_detected_at TEXT NOT NULL,
+    occurrence_count INTEGER NOT NULL DEFAULT 1,
+    severity REAL,
+    notes TEXT,
+    FOREIGN KEY (repo_id) REFERENCES repositories (id),
+    UNIQUE(repo_id, issue_type)
+) STRICT;
+
+-- Fix attempts table (track what was tried)
+CREATE TABLE IF NOT EXISTS fix_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo_id INTEGER NOT NULL,
+    issue_type TEXT NOT NULL,
+    fix_description TEXT NOT NULL,
+    outcome TEXT,
+    attempted_at TEXT NOT NULL,
+    FOREIGN KEY (repo_id) REFERENCES repositories (id)
+) STRICT;
+
+-- Repo profile table (metadata per repo)
+CREATE TABLE IF NOT EXISTS repo_profiles (
+    repo_id INTEGER PRIMARY KEY,
+    tech_stack TEXT,
+    team_size INTEGER,
+    project_type TEXT,
+    metadata_json TEXT,
+    FOREIGN KEY (repo_id) REFERENCES repositories (id)
+) STRICT;
+
+-- === ROASTING TABLES ===
+-- Scan sessions (one per repo analysis)
+CREATE TABLE IF NOT EXISTS scan_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo_path TEXT NOT NULL,
+    repo_name TEXT NOT NULL,
+    started_at TEXT,
+    completed_at TEXT,
+    total_issues INTEGER,
+    scan_duration_ms INTEGER
+) STRICT;
+
+-- Security issues (from Aikido)
+CREATE TABLE IF NOT EXISTS security_issues (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER,
+    severity TEXT NOT NULL,
+    category TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    issue_url TEXT,
+    fixed_at TEXT,
+    fix_notes TEXT,
+    FOREIGN KEY (session_id) REFERENCES scan_sessions (id)
+) STRICT;
+
+-- Git patterns (behavioral analysis)
+CREATE TABLE IF NOT EXISTS git_patterns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER,
+    pattern_type TEXT NOT NULL,
+    commit_sha TEXT,
+    commit_message TEXT,
+    lines_changed INTEGER,
+    FOREIGN KEY (session_id) REFERENCES scan_sessions (id)
+) STRICT;
+
+-- Behavioral patterns (flagged by Codex)
+CREATE TABLE IF NOT EXISTS behavioral_patterns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER,
+    pattern_name TEXT NOT NULL,
+    evidence TEXT,
+    severity TEXT,
+    first_flagged TEXT,
+    last_updated TEXT,
+    occurrence_count INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (session_id) REFERENCES scan_sessions (id)
+) STRICT;
+
+-- Recurring issues (cross-scan patterns)
+CREATE TABLE IF NOT EXISTS recurring_issues (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo_path TEXT NOT NULL,
+    issue_signature TEXT NOT NULL,
+    first_seen TEXT,
+    last_seen TEXT,
+    occurrence_count INTEGER NOT NULL DEFAULT 1,
+    UNIQUE(repo_path, issue_signature)
+) STRICT;
+
+-- Fix attempts (track what users tried)
+CREATE TABLE IF NOT EXISTS fix_attempts_roasting (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    issue_id INTEGER,
+    fix_prompt TEXT,
+    attempted_at TEXT,
+    success INTEGER,
+    notes TEXT,
+    FOREIGN KEY (issue_id) REFERENCES security_issues (id)
+) STRICT;
+
+-- === INDEXES ===
+-- Per-repo lookups in get_repo_context, in the order they are read
+CREATE INDEX IF NOT EXISTS idx_scans_repo_ts ON scans (repo_id, scan_timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_fix_attempts_repo_ts ON fix_attempts (repo_id, attempted_at DESC);
+CREATE INDEX IF NOT EXISTS idx_issue_flags_repo_occ ON issue_flags (repo_id, occurrence_count DESC);
+
+-- Session and per-repo lookups for the roasting tools
+CREATE INDEX IF NOT EXISTS idx_scan_sessions_repo_started ON scan_sessions (repo_path, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_security_issues_session ON security_issues (session_id, severity DESC);
+CREATE INDEX IF NOT EXISTS idx_git_patterns_session ON git_patterns (session_id);
+CREATE INDEX IF NOT EXISTS idx_behavioral_patterns_session_occ ON behavioral_patterns (session_id, occurrence_count DESC);
+-- Older databases may hold duplicate (session_id, pattern_name) rows; fold them
+-- into the oldest row so the unique index below can be created
+UPDATE behavioral_patterns SET
+    occurrence_count = (
+        SELECT SUM(d.occurrence_count) FROM behavioral_patterns d
+        WHERE d.session_id = behavioral_patterns.session_id
+          AND d.pattern_name = behavioral_patterns.pattern_name
+    ),
+    last_updated = (
+        SELECT MAX(d.last_updated) FROM behavioral_patterns d
+        WHERE d.session_id = behavioral_patterns.session_id
+          AND d.pattern_name = behavioral_patterns.pattern_name
+    )
+WHERE id IN (
+    SELECT MIN(id) FROM behavioral_patterns
+    WHERE session_id IS NOT NULL
+    GROUP BY session_id, pattern_name HAVING COUNT(*) > 1
+);
+DELETE FROM behavioral_patterns
+WHERE session_id IS NOT NULL AND id NOT IN (
+    SELECT MIN(id) FROM behavioral_patterns GROUP BY session_id, pattern_name
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_behavioral_patterns_session_name ON behavioral_patterns (session_id, pattern_name);
+CREATE INDEX IF NOT EXISTS idx_recurring_issues_repo_occ ON recurring_issues (repo_path, occurrence_count DESC);
+CREATE INDEX IF NOT EXISTS idx_fix_attempts_roasting_issue ON fix_attempts_roasting (issue_id, attempted_at DESC);
+
+-- Refresh planner statistics for the indexes
+ANALYZE;
+
+PRAGMA user_version = {SCHEMA_VERSION};
+
+COMMIT;
+"""
+
+_initialized = False
 
 
 def initialize_database():
     """Create all tables if they don't exist."""
+    global _initialized
+    if _initialized:
+        return
     with get_db() as conn:
-        # Repositories table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS repositories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                repo_path TEXT UNIQUE NOT NULL,
-                repo_name TEXT NOT NULL,
-                first_analyzed_at TEXT NOT NULL,
-                last_analyzed_at TEXT NOT NULL,
-                total_scans INTEGER DEFAULT 0
-            )
-        """)
-
-        # Scans table (each enrichment run)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS scans (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                repo_id INTEGER NOT NULL,
-                scan_timestamp TEXT NOT NULL,
-                git_patterns_json TEXT NOT NULL,
-                total_commits_analyzed INTEGER NOT NULL,
-                severity REAL NOT NULL,
-                scan_duration_ms INTEGER,
-                FOREIGN KEY (repo_id) REFERENCES repositories (id)
-            )
-        """)
-
-        # Issue flags table (recurring patterns with occurrence tracking)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS issue_flags (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                repo_id INTEGER NOT NULL,
-                issue_type TEXT NOT NULL,
-                first_detected_at TEXT NOT NULL,
-                last_detected_at TEXT NOT NULL,
-                occurrence_count INTEGER DEFAULT 1,
-                severity REAL,
-                notes TEXT,
-                FOREIGN KEY (repo_id) REFERENCES repositories (id),
-                UNIQUE(repo_id, issue_type)
-            )
-        """)
-
-        # Fix attempts table (track what was tried)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS fix_attempts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                repo_id INTEGER NOT NULL,
-                issue_type TEXT NOT NULL,
-                fix_description TEXT NOT NULL,
-                outcome TEXT,
-                attempted_at TEXT NOT NULL,
-                FOREIGN KEY (repo_id) REFERENCES repositories (id)
-            )
-        """)
-
-        # Repo profile table (metadata per repo)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS repo_profiles (
-                repo_id INTEGER PRIMARY KEY,
-                tech_stack TEXT,
-                team_size INTEGER,
-                project_type TEXT,
-                metadata_json TEXT,
-                FOREIGN KEY (repo_id) REFERENCES repositories (id)
-            )
-        """)
-
-        # === ROASTING TABLES ===
-        # Scan sessions (one per repo analysis)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS scan_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                repo_path TEXT NOT NULL,
-                repo_name TEXT NOT NULL,
-                started_at TEXT,
-                completed_at TEXT,
-                total_issues INTEGER,
-                scan_duration_ms INTEGER
-            )
-        """)
-
-        # Security issues (from Aikido)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS security_issues (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER,
-                severity TEXT NOT NULL,
-                category TEXT NOT NULL,
-                summary TEXT NOT NULL,
-                issue_url TEXT,
-                fixed_at TEXT,
-                fix_notes TEXT,
-                FOREIGN KEY (session_id) REFERENCES scan_sessions (id)
-            )
-        """)
-
-        # Git patterns (behavioral analysis)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS git_patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER,
-                pattern_type TEXT NOT NULL,
-                commit_sha TEXT,
-                commit_message TEXT,
-                lines_changed INTEGER,
-                FOREIGN KEY (session_id) REFERENCES scan_sessions (id)
-            )
-        """)
-
-        # Behavioral patterns (flagged by Codex)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS behavioral_patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER,
-                pattern_name TEXT NOT NULL,
-                evidence TEXT,
-                severity TEXT,
-                first_flagged TEXT,
-                last_updated TEXT,
-                occurrence_count INTEGER DEFAULT 1,
-                FOREIGN KEY (session_id) REFERENCES scan_sessions (id)
-            )
-        """)
-
-        # Recurring issues (cross-scan patterns)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS recurring_issues (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                repo_path TEXT NOT NULL,
-                issue_signature TEXT NOT NULL,
-                first_seen TEXT,
-                last_seen TEXT,
-                occurrence_count INTEGER DEFAULT 1,
-                UNIQUE(repo_path, issue_signature)
-            )
-        """)
-
-        # Fix attempts (track what users tried)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS fix_attempts_roasting (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                issue_id INTEGER,
-                fix_prompt TEXT,
-                attempted_at TEXT,
-                success INTEGER,
-                notes TEXT,
-                FOREIGN KEY (issue_id) REFERENCES security_issues (id)
-            )
-        """)
+        # Schema already current, skip the DDL
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            if sqlite3.sqlite_version_info < (3, 37, 0):
+                raise RuntimeError(
+                    f"SQLite {sqlite3.sqlite_version} is too old; the schema needs 3.37+ (STRICT tables)"
+                )
+            conn.executescript(_SCHEMA)
+    _initialized = True
 
 
-def get_or_create_repo(repo_path: str) -> int:
-    """Get repo ID or create if doesn't exist."""
-    repo_name = Path(repo_path).name
-    now = datetime.now().isoformat()
+# Rows written by the batch helpers since the planner statistics were refreshed
+_OPTIMIZE_EVERY = 1000
+_bulk_rows = 0
 
-    with get_db() as conn:
-        # Try to get existing
-        result = conn.execute(
-            "SELECT id FROM repositories WHERE repo_path = ?",
-            (repo_path,)
-        ).fetchone()
 
-        if result:
-            # Update last analyzed
-            conn.execute(
-                "UPDATE repositories SET last_analyzed_at = ? WHERE id = ?",
-                (now, result['id'])
-            )
-            return result['id']
+def _bulk_write(conn: sqlite3.Connection, sql: str, rows: List[Tuple]):
+    """executemany() for the batch helpers; refreshes stale statistics every _OPTIMIZE_EVERY rows."""
+    global _bulk_rows
+    conn.executemany(sql, rows)
+    _bulk_rows += len(rows)
+    if _bulk_rows >= _OPTIMIZE_EVERY:
+        # Re-analyzes only the tables whose statistics have drifted
+        conn.execute("PRAGMA optimize")
+        _bulk_rows = 0
 
-        # Create new
-        cursor = conn.execute(
-            """INSERT INTO repositories (repo_path, repo_name, first_analyzed_at, last_analyzed_at, total_scans)
-               VALUES (?, ?, ?, ?, 0)""",
-            (repo_path, repo_name, now, now)
-        )
-        return cursor.lastrowid
+
+def get_or_create_repo(repo_path: str, conn: Optional[sqlite3.Connection] = None) -> int:
+    """Get repo ID or create if doesn't exist."""
+    repo_name = Path(repo_path).name
+    with get_db(conn) as conn:
+        # Create, or bump last analyzed on the existing row (SQLite >= 3.35 for RETURNING)
+        return conn.execute(
+            f"""INSERT INTO repositories (repo_path, repo_name, first_analyzed_at, last_analyzed_at, total_scans)
+               VALUES (?, ?, {_NOW}, {_NOW}, 0)
+               ON CONFLICT(repo_path) DO UPDATE SET last_analyzed_at = excluded.last_analyzed_at
+               RETURNING id""",
+            (repo_path, repo_name)
+        ).fetchone()['id']
 
 
 def save_scan(repo_id: int, git_patterns: List[Dict], total_commits: int, severity: float, duration_ms: int = 0):
     """Save scan results."""
-    now = datetime.now().isoformat()
-
     with get_db() as conn:
         conn.execute(
-            """INSERT INTO scans (repo_id, scan_timestamp, git_patterns_json, total_commits_analyzed, severity, scan_duration_ms)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (repo_id, now, json.dumps(git_patterns), total_commits, severity, duration_ms)
+            f"""INSERT INTO scans (repo_id, scan_timestamp, git_patterns_json, total_commits_analyzed, severity, scan_duration_ms)
+               VALUES (?, {_NOW}, ?, ?, ?, ?)""",
+            (repo_id, _dumps(git_patterns), total_commits, severity, duration_ms)
         )
 
         # Increment scan count
@@ -227,38 +434,110 @@ def save_scan(repo_id: int, git_patterns: List[Dict], total_commits: int, severi
         )
 
 
-def flag_issue(repo_id: int, issue_type: str, severity: float = 0.5, notes: str = ""):
-    """Flag an issue - increment occurrence_count if exists, create if new."""
-    now = datetime.now().isoformat()
+_FLAG_ISSUE_SQL = f"""INSERT INTO issue_flags (repo_id, issue_type, first_detected_at, last_detected_at, occurrence_count, severity, notes)
+               VALUES (?, ?, {_NOW}, {_NOW}, 1, ?, ?)
+               ON CONFLICT(repo_id, issue_type) DO UPDATE SET
+                   occurrence_count = occurrence_count + 1,
+                   last_detected_at = excluded.last_detected_at,
+                   severity = excluded.severity,
+                   notes = excluded.notes"""
 
+
+def flag_issue(repo_id: int, issue_type: str, severity: float = 0.5, notes: str = "") -> int:
+    """Flag an issue - increment occurrence_count if exists, create if new.
+
+    Returns the issue's occurrence count after this flag.
+    """
     with get_db() as conn:
-        # Try to get existing
-        result = conn.execute(
-            "SELECT occurrence_count FROM issue_flags WHERE repo_id = ? AND issue_type = ?",
-            (repo_id, issue_type)
-        ).fetchone()
+        return conn.execute(
+            _FLAG_ISSUE_SQL + "\n               RETURNING occurrence_count",
+            (repo_id, issue_type, severity, notes)
+        ).fetchone()['occurrence_count']
 
-        if result:
-            # Increment occurrence count
-            conn.execute(
-                """UPDATE issue_flags
-                   SET occurrence_count = occurrence_count + 1,
-                       last_detected_at = ?,
-                       severity = ?,
-                       notes = ?
-                   WHERE repo_id = ? AND issue_type = ?""",
-                (now, severity, notes, repo_id, issue_type)
-            )
-        else:
-            # Create new
-            conn.execute(
-                """INSERT INTO issue_flags (repo_id, issue_type, first_detected_at, last_detected_at, occurrence_count, severity, notes)
-                   VALUES (?, ?, ?, ?, 1, ?, ?)""",
-                (repo_id, issue_type, now, now, severity, notes)
-            )
+
+def flag_issues(repo_id: int, items: List[Tuple[str, float, str]]):
+    """Flag several issues in one transaction; items are (issue_type, severity, notes)."""
+    with get_db() as conn:
+        _bulk_write(conn, _FLAG_ISSUE_SQL, [(repo_id, issue_type, severity, notes) for issue_type, severity, notes in items])
+
+
+# get_repo_context in one statement: the repo row plus its recent scans, flags,
+# fix attempts and profile, aggregated into a single JSON document by SQLite.
+# json() keeps the nested arrays/objects as JSON rather than quoted strings.
+_Q_CONTEXT = """SELECT json_object(
+    'repo_info', json_object(
+        'repo_path', r.repo_path,
+        'repo_name', r.repo_name,
+        'first_analyzed', r.first_analyzed_at,
+        'last_analyzed', r.last_analyzed_at,
+        'total_scans', r.total_scans
+    ),
+    -- Last 5 scans
+    'recent_scans', json((
+        SELECT json_group_array(json_object(
+            'scan_timestamp', scan_timestamp,
+            'total_commits_analyzed', total_commits_analyzed,
+            'severity', severity
+        ))
+        FROM (SELECT scan_timestamp, total_commits_analyzed, severity
+              FROM scans
+              WHERE repo_id = r.id
+              ORDER BY scan_timestamp DESC
+              LIMIT 5)
+    )),
+    -- All flagged issues with occurrence counts
+    'flagged_issues', json((
+        SELECT json_group_array(json_object(
+            'issue_type', issue_type,
+            'occurrence_count', occurrence_count,
+            'severity', severity,
+            'first_detected_at', first_detected_at,
+            'last_detected_at', last_detected_at,
+            'notes', notes
+        ))
+        FROM (SELECT issue_type, occurrence_count, severity, first_detected_at, last_detected_at, notes
+              FROM issue_flags
+              WHERE repo_id = r.id
+              ORDER BY occurrence_count DESC)
+    )),
+    -- Last 10 fix attempts
+    'fix_attempts', json((
+        SELECT json_group_array(json_object(
+            'issue_type', issue_type,
+            'fix_description', fix_description,
+            'outcome', outcome,
+            'attempted_at', attempted_at
+        ))
+        FROM (SELECT issue_type, fix_description, outcome, attempted_at
+              FROM fix_attempts
+              WHERE repo_id = r.id
+              ORDER BY attempted_at DESC
+              LIMIT 10)
+    )),
+    'profile', json((
+        SELECT json_object(
+            'repo_id', repo_id,
+            'tech_stack', tech_stack,
+            'team_size', team_size,
+            'project_type', project_type,
+            'metadata_json', metadata_json
+        )
+        FROM repo_profiles
+        WHERE repo_id = r.id
+    ))
+)
+FROM repositories r
+WHERE r.repo_path = ?"""
+
+
+# get_repo_context results per repo path: (write generation, time, context).
+# Any write from this process invalidates them; the TTL bounds how long a
+# write from another process can go unseen.
+_CONTEXT_TTL = 5.0  # seconds
+_context_cache: Dict[str, Tuple[int, float, Dict[str, Any]]] = {}
 
 
-def get_repo_context(repo_path: str) -> Dict[str, Any]:
+def get_repo_context(repo_path: str, *, create: bool = False) -> Dict[str, Any]:
     """
     THE KEY FUNCTION - Get comprehensive repo context (like secretsoul's get_session_context).
 
@@ -268,75 +547,46 @@ def get_repo_context(repo_path: str) -> Dict[str, Any]:
     - Flagged issues with occurrence counts
     - Fix attempts history
     - Recurring patterns
-    """
-    repo_id = get_or_create_repo(repo_path)
 
-    with get_db() as conn:
-        # Get repo metadata
-        repo = conn.execute(
-            "SELECT * FROM repositories WHERE id = ?",
-            (repo_id,)
-        ).fetchone()
-
-        # Get recent scans (last 5)
-        recent_scans = conn.execute(
-            """SELECT scan_timestamp, total_commits_analyzed, severity
-               FROM scans
-               WHERE repo_id = ?
-               ORDER BY scan_timestamp DESC
-               LIMIT 5""",
-            (repo_id,)
-        ).fetchall()
+    Read-only unless create=True, which registers the repo (and bumps
+    last_analyzed_at) first. Returns an empty dict for an unknown repo.
+    Results are cached until the next write; treat them as read-only.
+    """
+    if create:
+        get_or_create_repo(repo_path)
 
-        # Get all flagged issues with occurrence counts
-        flagged_issues = conn.execute(
-            """SELECT issue_type, occurrence_count, severity, first_detected_at, last_detected_at, notes
-               FROM issue_flags
-               WHERE repo_id = ?
-               ORDER BY occurrence_count DESC""",
-            (repo_id,)
-        ).fetchall()
+    # Inside a write block the caller must see its own uncommitted changes
+    in_write = _db_owner == threading.get_ident()
+    cached = _context_cache.get(repo_path)
+    if (not in_write and cached and cached[0] == _write_gen
+            and time.monotonic() - cached[1] < _CONTEXT_TTL):
+        return cached[2]
 
-        # Get recent fix attempts (last 10)
-        fix_attempts = conn.execute(
-            """SELECT issue_type, fix_description, outcome, attempted_at
-               FROM fix_attempts
-               WHERE repo_id = ?
-               ORDER BY attempted_at DESC
-               LIMIT 10""",
-            (repo_id,)
-        ).fetchall()
+    generation = _write_gen  # read first, so a write during the query marks it stale
+    with get_db(readonly=True) as conn:
+        row = conn.execute(_Q_CONTEXT, (repo_path,)).fetchone()
+    context = _loads(row[0]) if row else {}
+    if not in_write:
+        _context_cache[repo_path] = (generation, time.monotonic(), context)
+    return context
 
-        # Get repo profile
-        profile = conn.execute(
-            "SELECT * FROM repo_profiles WHERE repo_id = ?",
-            (repo_id,)
-        ).fetchone()
 
-        return {
-            "repo_info": {
-                "repo_path": repo['repo_path'],
-                "repo_name": repo['repo_name'],
-                "first_analyzed": repo['first_analyzed_at'],
-                "last_analyzed": repo['last_analyzed_at'],
-                "total_scans": repo['total_scans']
-            },
-            "recent_scans": [dict(scan) for scan in recent_scans],
-            "flagged_issues": [dict(issue) for issue in flagged_issues],
-            "fix_attempts": [dict(attempt) for attempt in fix_attempts],
-            "profile": dict(profile) if profile else None
-        }
+_SAVE_FIX_SQL = f"""INSERT INTO fix_attempts (repo_id, issue_type, fix_description, outcome, attempted_at)
+               VALUES (?, ?, ?, ?, {_NOW})"""
 
 
 def save_fix_attempt(repo_id: int, issue_type: str, fix_description: str, outcome: str = ""):
     """Save a fix attempt."""
-    now = datetime.now().isoformat()
+    with get_db() as conn:
+        conn.execute(_SAVE_FIX_SQL, (repo_id, issue_type, fix_description, outcome))
 
+
+def save_fix_attempts(repo_id: int, items: List[Tuple[str, str, str]]):
+    """Save several fix attempts in one transaction; items are (issue_type, fix_description, outcome)."""
     with get_db() as conn:
-        conn.execute(
-            """INSERT INTO fix_attempts (repo_id, issue_type, fix_description, outcome, attempted_at)
-               VALUES (?, ?, ?, ?, ?)""",
-            (repo_id, issue_type, fix_description, outcome, now)
+        _bulk_write(
+            conn, _SAVE_FIX_SQL,
+            [(repo_id, issue_type, fix_description, outcome) for issue_type, fix_description, outcome in items]
         )
 
 
@@ -346,7 +596,7 @@ def update_repo_profile(repo_id: int, tech_stack: str = "", team_size: int = 0,
         conn.execute(
             """INSERT OR REPLACE INTO repo_profiles (repo_id, tech_stack, team_size, project_type, metadata_json)
                VALUES (?, ?, ?, ?, ?)""",
-            (repo_id, tech_stack, team_size, project_type, json.dumps(metadata or {}))
+            (repo_id, tech_stack, team_size, project_type, _dumps(metadata) if metadata else _EMPTY_JSON)
         )
 
 
@@ -355,126 +605,160 @@ def update_repo_profile(repo_id: int, tech_stack: str = "", team_size: int = 0,
 def create_scan_session(repo_path: str) -> int:
     """Create a new scan session and return session ID."""
     repo_name = Path(repo_path).name
-    now = datetime.now().isoformat()
-
     with get_db() as conn:
         cursor = conn.execute(
-            """INSERT INTO scan_sessions (repo_path, repo_name, started_at, total_issues)
-               VALUES (?, ?, ?, 0)""",
-            (repo_path, repo_name, now)
+            f"""INSERT INTO scan_sessions (repo_path, repo_name, started_at, total_issues)
+               VALUES (?, ?, {_NOW}, 0)""",
+            (repo_path, repo_name)
         )
         return cursor.lastrowid
 
 
 def complete_scan_session(session_id: int, total_issues: int, duration_ms: int):
     """Mark scan session as completed."""
-    now = datetime.now().isoformat()
-
     with get_db() as conn:
         conn.execute(
-            """UPDATE scan_sessions
-               SET completed_at = ?, total_issues = ?, scan_duration_ms = ?
+            f"""UPDATE scan_sessions
+               SET completed_at = {_NOW}, total_issues = ?, scan_duration_ms = ?
                WHERE id = ?""",
-            (now, total_issues, duration_ms, session_id)
+            (total_issues, duration_ms, session_id)
         )
 
 
+_SAVE_SECURITY_ISSUE_SQL = """INSERT INTO security_issues (session_id, severity, category, summary, issue_url)
+               VALUES (?, ?, ?, ?, ?)"""
+
+
 def save_security_issue(session_id: int, severity: str, category: str, summary: str, issue_url: str = ""):
     """Save a security issue from Aikido scan."""
     with get_db() as conn:
-        cursor = conn.execute(
-            """INSERT INTO security_issues (session_id, severity, category, summary, issue_url)
-               VALUES (?, ?, ?, ?, ?)""",
-            (session_id, severity, category, summary, issue_url)
-        )
+        cursor = conn.execute(_SAVE_SECURITY_ISSUE_SQL, (session_id, severity, category, summary, issue_url))
         return cursor.lastrowid
 
 
+def save_security_issues(session_id: int, items: List[Tuple[str, str, str, str]]):
+    """Save several security issues in one transaction; items are (severity, category, summary, issue_url)."""
+    with get_db() as conn:
+        _bulk_write(
+            conn, _SAVE_SECURITY_ISSUE_SQL,
+            [(session_id, severity, category, summary, issue_url) for severity, category, summary, issue_url in items]
+        )
+
+
+_SAVE_GIT_PATTERN_SQL = """INSERT INTO git_patterns (session_id, pattern_type, commit_sha, commit_message, lines_changed)
+               VALUES (?, ?, ?, ?, ?)"""
+
+
 def save_git_pattern(session_id: int, pattern_type: str, commit_sha: str = "", commit_message: str = "", lines_changed: int = 0):
     """Save a git pattern from behavioral analysis."""
     with get_db() as conn:
-        conn.execute(
-            """INSERT INTO git_patterns (session_id, pattern_type, commit_sha, commit_message, lines_changed)
-               VALUES (?, ?, ?, ?, ?)""",
-            (session_id, pattern_type, commit_sha, commit_message, lines_changed)
+        conn.execute(_SAVE_GIT_PATTERN_SQL, (session_id, pattern_type, commit_sha, commit_message, lines_changed))
+
+
+def save_git_patterns(session_id: int, items: List[Tuple[str, str, str, int]]):
+    """Save several git patterns in one transaction; items are (pattern_type, commit_sha, commit_message, lines_changed)."""
+    with get_db() as conn:
+        _bulk_write(
+            conn, _SAVE_GIT_PATTERN_SQL,
+            [(session_id, pattern_type, commit_sha, commit_message, lines_changed)
+             for pattern_type, commit_sha, commit_message, lines_changed in items]
         )
 
 
-def flag_behavioral_pattern(session_id: int, pattern_name: str, evidence: str = "", severity: str = "medium"):
-    """Flag a behavioral pattern - increment occurrence_count if exists, create if new."""
-    now = datetime.now().isoformat()
+def flag_behavioral_pattern(session_id: int, pattern_name: str, evidence: str = "", severity: str = "medium") -> int:
+    """Flag a behavioral pattern - increment occurrence_count if exists, create if new.
 
-    with get_db() as conn:
-        # Try to get existing
-        result = conn.execute(
-            "SELECT occurrence_count FROM behavioral_patterns WHERE session_id = ? AND pattern_name = ?",
-            (session_id, pattern_name)
-        ).fetchone()
+    Returns the pattern's occurrence count after this flag.
 
-        if result:
-            # Increment occurrence count
-            conn.execute(
-                """UPDATE behavioral_patterns
-                   SET occurrence_count = occurrence_count + 1,
-                       last_updated = ?,
-                       evidence = ?,
-                       severity = ?
-                   WHERE session_id = ? AND pattern_name = ?""",
-                (now, evidence, severity, session_id, pattern_name)
-            )
-        else:
-            # Create new
-            conn.execute(
-                """INSERT INTO behavioral_patterns (session_id, pattern_name, evidence, severity, first_flagged, last_updated, occurrence_count)
-                   VALUES (?, ?, ?, ?, ?, ?, 1)""",
-                (session_id, pattern_name, evidence, severity, now, now)
-            )
+    Raises:
+        ValueError: If no scan session has this id
+    """
+    try:
+        with get_db() as conn:
+            return conn.execute(
+                f"""INSERT INTO behavioral_patterns (session_id, pattern_name, evidence, severity, first_flagged, last_updated, occurrence_count)
+                   VALUES (?, ?, ?, ?, {_NOW}, {_NOW}, 1)
+                   ON CONFLICT(session_id, pattern_name) DO UPDATE SET
+                       occurrence_count = occurrence_count + 1,
+                       last_updated = excluded.last_updated,
+                       evidence = excluded.evidence,
+                       severity = excluded.severity
+                   RETURNING occurrence_count""",
+                (session_id, pattern_name, evidence, severity)
+            ).fetchone()['occurrence_count']
+    except sqlite3.IntegrityError as e:
+        # foreign_keys=ON rejects patterns for sessions that don't exist
+        if 'FOREIGN KEY' not in str(e):
+            raise
+        raise ValueError(f"Unknown session_id: {session_id}") from None
+
+
+_TRACK_RECURRING_SQL = f"""INSERT INTO recurring_issues (repo_path, issue_signature, first_seen, last_seen, occurrence_count)
+               VALUES (?, ?, {_NOW}, {_NOW}, 1)
+               ON CONFLICT(repo_path, issue_signature) DO UPDATE SET
+                   occurrence_count = occurrence_count + 1,
+                   last_seen = excluded.last_seen"""
 
 
 def track_recurring_issue(repo_path: str, issue_signature: str):
     """Track a recurring issue across scans - increment occurrence_count if exists."""
-    now = datetime.now().isoformat()
-
     with get_db() as conn:
-        # Try to get existing
-        result = conn.execute(
-            "SELECT occurrence_count FROM recurring_issues WHERE repo_path = ? AND issue_signature = ?",
-            (repo_path, issue_signature)
-        ).fetchone()
+        conn.execute(_TRACK_RECURRING_SQL, (repo_path, issue_signature))
 
-        if result:
-            # Increment occurrence count
-            conn.execute(
-                """UPDATE recurring_issues
-                   SET occurrence_count = occurrence_count + 1,
-                       last_seen = ?
-                   WHERE repo_path = ? AND issue_signature = ?""",
-                (now, repo_path, issue_signature)
-            )
-        else:
-            # Create new
-            conn.execute(
-                """INSERT INTO recurring_issues (repo_path, issue_signature, first_seen, last_seen, occurrence_count)
-                   VALUES (?, ?, ?, ?, 1)""",
-                (repo_path, issue_signature, now, now)
-            )
 
+def track_recurring_issues(repo_path: str, issue_signatures: List[str]):
+    """Track several recurring issues for one repo in one transaction."""
+    with get_db() as conn:
+        _bulk_write(conn, _TRACK_RECURRING_SQL, [(repo_path, sig) for sig in issue_signatures])
 
-def save_fix_attempt(issue_id: int, fix_prompt: str, success: bool, notes: str = ""):
-    """Save a fix attempt for a security issue."""
-    now = datetime.now().isoformat()
 
+def save_roasting_fix_attempt(issue_id: int, fix_prompt: str, success: bool, notes: str = ""):
+    """Save a fix attempt for a security issue."""
     with get_db() as conn:
         conn.execute(
-            """INSERT INTO fix_attempts_roasting (issue_id, fix_prompt, attempted_at, success, notes)
-               VALUES (?, ?, ?, ?, ?)""",
-            (issue_id, fix_prompt, now, 1 if success else 0, notes)
+            f"""INSERT INTO fix_attempts_roasting (issue_id, fix_prompt, attempted_at, success, notes)
+               VALUES (?, ?, {_NOW}, ?, ?)""",
+            (issue_id, fix_prompt, success, notes)
         )
 
 
+def get_security_issue(issue_id: int) -> Dict[str, Any]:
+    """
+    Get a security issue with its session's repo and its last 3 fix attempts.
+
+    One query; the attempts come back as a JSON array in recent_fix_attempts.
+    Returns {} if the issue doesn't exist.
+    """
+    with get_db(readonly=True) as conn:
+        issue = conn.execute(
+            """SELECT si.*, ss.repo_path, ss.repo_name,
+                      (SELECT json_group_array(json_object(
+                                  'fix_prompt', fix_prompt,
+                                  'success', success,
+                                  'notes', notes,
+                                  'attempted_at', attempted_at
+                              ))
+                       FROM (SELECT fix_prompt, success, notes, attempted_at
+                             FROM fix_attempts_roasting
+                             WHERE issue_id = si.id
+                             ORDER BY attempted_at DESC
+                             LIMIT 3)) AS recent_fix_attempts
+               FROM security_issues si
+               JOIN scan_sessions ss ON si.session_id = ss.id
+               WHERE si.id = ?""",
+            (issue_id,)
+        ).fetchone()
+
+    if not issue:
+        return {}
+    issue = dict(issue)
+    issue['recent_fix_attempts'] = _loads(issue['recent_fix_attempts'])
+    return issue
+
+
 def get_scan_history(repo_path: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Get scan history for a repository."""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         scans = conn.execute(
             """SELECT id, repo_name, started_at, completed_at, total_issues, scan_duration_ms
                FROM scan_sessions
@@ -484,12 +768,12 @@ def get_scan_history(repo_path: str, limit: int = 10) -> List[Dict[str, Any]]:
             (repo_path, limit)
         ).fetchall()
 
-        return [dict(scan) for scan in scans]
+        return list(map(dict, scans))
 
 
 def get_recurring_issues_for_repo(repo_path: str) -> List[Dict[str, Any]]:
     """Get all recurring issues for a repository."""
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         issues = conn.execute(
             """SELECT issue_signature, occurrence_count, first_seen, last_seen
                FROM recurring_issues
@@ -498,7 +782,7 @@ def get_recurring_issues_for_repo(repo_path: str) -> List[Dict[str, Any]]:
             (repo_path,)
         ).fetchall()
 
-        return [dict(issue) for issue in issues]
+        return list(map(dict, issues))
 
 
 def get_session_details(session_id: int) -> Dict[str, Any]:
@@ -511,7 +795,7 @@ def get_session_details(session_id: int) -> Dict[str, Any]:
     - Git patterns detected
     - Behavioral patterns flagged
     """
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         # Get session metadata
         session = conn.execute(
             "SELECT * FROM scan_sessions WHERE id = ?",
@@ -549,9 +833,9 @@ def get_session_details(session_id: int) -> Dict[str, Any]:
 
         return {
             "session": dict(session),
-            "security_issues": [dict(issue) for issue in security_issues],
-            "git_patterns": [dict(pattern) for pattern in git_patterns],
-            "behavioral_patterns": [dict(pattern) for pattern in behavioral_patterns]
+            "security_issues": list(map(dict, security_issues)),
+            "git_patterns": list(map(dict, git_patterns)),
+            "behavioral_patterns": list(map(dict, behavioral_patterns))
         }
 
 
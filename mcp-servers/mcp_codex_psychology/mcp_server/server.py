@@ -1,17 +1,34 @@
 """FastMCP server for developer psychology analysis via git patterns."""
 
 from fastmcp import FastMCP
-from typing import Optional, List, Dict, Any, Union
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Union, Tuple
+import re
 import json
+import time
+import atexit
+import signal
+import subprocess
+from collections import Counter
+from functools import lru_cache
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
-from git import Repo
 import httpx
 import ssl
 import certifi
 import os
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    # GitPython probes the git binary on import; set_repository imports it on first use
+    from git import Repo
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is the fallback
+    orjson = None
+
 # Load environment variables from .env file
 # Look for .env in the parent directory of mcp_server/
 env_path = Path(__file__).parent.parent / '.env'
@@ -26,12 +43,248 @@ KONTEXT_BASE_URL = "https://staging-api.kontext.dev"
 KONTEXT_ORG_ID = "cmh6h4j6c0004pm0k3q9kceit"
 KONTEXT_DEVELOPER_ID = "cmh6bce1u000dpe0kae1phdsg"
 
+def _cleanup_on_sigterm(signum, frame):
+    """Run the atexit cleanup (scanner container, database), then die by SIGTERM as before."""
+    atexit._run_exitfuncs()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP):
+    """Stop the warm Aikido scanner container when the server shuts down."""
+    # The stdio transport leaves SIGTERM at its default, which kills the
+    # process without running any cleanup; HTTP servers install their own
+    if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, _cleanup_on_sigterm)
+    try:
+        yield
+    finally:
+        from .aikido_integration import AikidoScanner
+        await AikidoScanner.aclose()
+
+
 # Initialize FastMCP server
-mcp = FastMCP("codex-psychology")
+mcp = FastMCP("codex-psychology", lifespan=_lifespan)
+
+
+def _json(obj: Any) -> str:
+    """Encode a tool response, using orjson when it is installed."""
+    if orjson is not None:
+        # Histograms are keyed by int (hour of day)
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, separators=(",", ":"), default=datetime.isoformat)
+
+
+def _error(message: str) -> str:
+    """Encode an error response."""
+    return _json({"status": "error", "message": message})
+
 
 # Current repository path (in-memory state)
 _current_repo_path: Optional[str] = None
 _current_repo_id: Optional[int] = None
+_current_repo: Optional["Repo"] = None  # opened once in set_repository
+# (path, inode of .git) the handle was opened for, so a re-cloned path reopens
+_current_repo_key: Optional[Tuple[str, int]] = None
+
+
+def _check_repo_path(repo_path: str) -> Optional[str]:
+    """Error response if repo_path isn't a git checkout, else None."""
+    # .git is a directory, or a file in worktrees; one stat on the happy path
+    if os.path.exists(os.path.join(repo_path, ".git")):
+        return None
+    if not os.path.exists(repo_path):
+        return _json({
+            "status": "error",
+            "message": f"Repository path does not exist: {repo_path}"
+        })
+    return _json({
+        "status": "error",
+        "message": f"Not a git repository: {repo_path}"
+    })
+
+
+_NO_REPO_ERROR = _error("No repository set. Call set_repository() first.")
+
+_DISCOVERY_QUESTIONS = (
+    "On a scale of 1-10, how would you rate the overall quality of this codebase?",
+    "What do you think is the biggest potential of this project?",
+    "What concerns do you have about the code, if any?"
+)
+
+
+def _require_repo() -> Optional[str]:
+    """Error response if set_repository() hasn't been called yet, else None."""
+    return None if _current_repo_path else _NO_REPO_ERROR
+
+
+# Commit message language patterns, matched case-insensitively at the start of
+# a word so inflections still count ("fixes", "updated") but words merely
+# containing one don't ("prefix", "debug"). The word lists are the single
+# source for the compiled regexes below.
+_WORD_CATEGORIES: Dict[str, Tuple[str, ...]] = {
+    "minimizing": ("just", "quick", "small", "minor", "tiny", "little"),
+    "defensive": ("fix", "oops", "my bad", "sorry", "mistake", "bug"),
+    "perfectionist": ("perfect", "complete", "final", "done", "finished"),
+    "vague": ("update", "change", "stuff", "things", "misc"),
+}
+_CATEGORY_RES = {
+    category: re.compile(r'\b(?:' + '|'.join(map(re.escape, words)) + ')', re.IGNORECASE)
+    for category, words in _WORD_CATEGORIES.items()
+}
+# All categories in one pattern so each message is scanned once; keywords
+# never share a starting word across categories, so no hit masks another
+_CATEGORY_SCAN_RE = re.compile(
+    '|'.join(f'(?P<{category}>{pattern.pattern})' for category, pattern in _CATEGORY_RES.items()),
+    re.IGNORECASE
+)
+_MINIMIZING_RE = _CATEGORY_RES["minimizing"]
+_VAGUE_RE = _CATEGORY_RES["vague"]
+
+
+def _message_categories(message: str) -> set:
+    """Categories whose keywords appear in `message`, in one scan that stops once all have hit."""
+    found = set()
+    for match in _CATEGORY_SCAN_RE.finditer(message):
+        found.add(match.lastgroup)
+        if len(found) == len(_CATEGORY_RES):
+            break
+    return found
+
+
+def _subject(message: str) -> str:
+    """First line of a commit message, without splitting the rest of it."""
+    return message.partition('\n')[0]
+
+
+def _git_log(
+    repo_path: str,
+    revisions: List[str],
+    numstat: bool = True,
+    stdin: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run one `git log` over `revisions` and parse every commit it prints.
+
+    With numstat, line/file counts match GitPython's `commit.stats.total`:
+    merges are diffed against their first parent, renames are not detected,
+    and binary files count as a changed file with 0 lines. Without it git
+    never computes a diff.
+
+    Returns:
+        List of dicts with sha, message, committed (ISO 8601 with the
+        committer's offset) and, with numstat, lines and files
+    """
+    args = ['git', '-C', repo_path, 'log', '--format=%x00%H%x00%cI%x00%B%x00']
+    if numstat:
+        args += ['--no-renames', '--diff-merges=first-parent', '--numstat']
+    output = subprocess.run(
+        args + revisions,
+        input=stdin,
+        capture_output=True,
+        check=True,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    ).stdout
+
+    # "\0sha\0date\0message\0numstat..." per commit; messages can't contain NUL
+    fields = output.split('\x00')
+    commits = []
+    for i in range(1, len(fields) - 3, 4):
+        sha, committed, message, diffstat = fields[i:i + 4]
+        commit = {"sha": sha, "message": message, "committed": committed}
+        if numstat:
+            lines = files = 0
+            for row in diffstat.splitlines():
+                if not row:
+                    continue
+                added, removed, _ = row.split('\t', 2)
+                files += 1
+                if added != '-':  # binary
+                    lines += int(added) + int(removed)
+            commit["lines"] = lines
+            commit["files"] = files
+        commits.append(commit)
+    return commits
+
+
+# Parsed `git log --numstat` records per repo path: (HEAD sha, commits
+# requested, records). History below a sha never changes, so any request for
+# at most that many commits from the same HEAD is a slice of this one.
+_RECORDS_CACHE: Dict[str, Tuple[str, int, Tuple[Dict[str, Any], ...]]] = {}
+
+# Commits prefetched in the background by set_repository (the tools' default limit)
+_WARM_LIMIT = 50
+_warm_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="git-warm")
+
+
+def _cached_commit_stats(repo_path: str, head_sha: str, limit: int) -> Optional[Tuple[Dict[str, Any], ...]]:
+    """The last `limit` records up to `head_sha` if already fetched, else None."""
+    cached = _RECORDS_CACHE.get(repo_path)
+    if cached and cached[0] == head_sha:
+        _, fetched, records = cached
+        # Fewer records than requested means the whole history is there
+        if limit <= fetched or len(records) < fetched:
+            return records[:limit]
+    return None
+
+
+def _bulk_commit_stats(repo_path: str, head_sha: str, limit: int) -> Tuple[Dict[str, Any], ...]:
+    """
+    Read the last `limit` commits up to `head_sha` with their change sizes.
+
+    One `git log --numstat` call instead of the `git diff` that GitPython's
+    `commit.stats` runs per commit. Memoized per repo and HEAD, so tools run
+    back to back (or after set_repository's warm-up) share one git call.
+    Callers must not mutate the returned records.
+    """
+    records = _cached_commit_stats(repo_path, head_sha, limit)
+    if records is None:
+        records = tuple(_git_log(repo_path, [f'-n{limit}', head_sha]))
+        _RECORDS_CACHE[repo_path] = (head_sha, limit, records)
+    return records
+
+
+def _warm_commit_stats(repo_path: str, head_sha: str) -> None:
+    """Background prefetch for the analysis tools; failures surface when a tool runs."""
+    try:
+        _bulk_commit_stats(repo_path, head_sha, _WARM_LIMIT)
+    except Exception:
+        pass
+
+
+def _commit_stats_for(repo_path: str, shas: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Line/file counts for just the given commits, keyed by full sha."""
+    if not shas:
+        return {}
+    commits = _git_log(repo_path, ['--no-walk', '--stdin'], stdin='\n'.join(shas) + '\n')
+    return {commit['sha']: commit for commit in commits}
+
+
+@lru_cache(maxsize=8)
+def _commit_count(repo_path: str, head_sha: str) -> int:
+    """Commits reachable from `head_sha`, capped at 1000; memoized per sha."""
+    # Counted by git itself rather than by building Commit objects
+    return int(subprocess.run(
+        ['git', '-C', repo_path, 'rev-list', '--count', '--max-count=1000', head_sha],
+        capture_output=True,
+        check=True,
+        text=True
+    ).stdout)
+
+
+def _repo_key(repo_path: str) -> Tuple[str, int]:
+    """Identity of a repository on disk: its path and the inode of its .git."""
+    return repo_path, os.stat(os.path.join(repo_path, '.git')).st_ino
+
+
+def _open_repo(repo_path: str) -> "Repo":
+    """Open a repository; GitPython is imported on first use."""
+    from git import Repo
+
+    return Repo(repo_path)
 
 
 @mcp.tool()
@@ -47,48 +300,103 @@ def set_repository(repo_path: str) -> str:
 
     🤖 CODEX: Call this first with the repository path provided by the user.
     """
-    global _current_repo_path, _current_repo_id
+    global _current_repo_path, _current_repo_id, _current_repo, _current_repo_key
 
-    repo_path_obj = Path(repo_path)
-    if not repo_path_obj.exists():
-        return json.dumps({
-            "status": "error",
-            "message": f"Repository path does not exist: {repo_path}"
-        })
-
-    if not (repo_path_obj / ".git").exists():
-        return json.dumps({
-            "status": "error",
-            "message": f"Not a git repository: {repo_path}"
-        })
-
-    _current_repo_path = repo_path
-
-    # Get or create repo in database
-    _current_repo_id = db.get_or_create_repo(repo_path)
+    error = _check_repo_path(repo_path)
+    if error:
+        return error
 
     # Get basic repo info
     try:
-        repo = Repo(repo_path)
-        branch = repo.active_branch.name
-        commit_count = len(list(repo.iter_commits('HEAD', max_count=1000)))
+        # Setting the same repository again reuses its handle
+        repo_key = _repo_key(repo_path)
+        reuse = repo_key == _current_repo_key
+        repo = _current_repo if reuse else _open_repo(repo_path)
+
+        try:
+            # Get or create repo in database
+            repo_id = db.get_or_create_repo(repo_path)
+
+            branch = repo.active_branch.name
+            head_sha = repo.head.commit.hexsha
+            commit_count = _commit_count(repo_path, head_sha)
+        except Exception:
+            if not reuse:
+                repo.close()
+            raise
+
+        # Switch repositories only once everything above succeeded, so a
+        # failure leaves the previous one (or the "No repository set" guard)
+        # fully in place. The replaced handle is closed to stop its
+        # persistent `git cat-file` processes.
+        previous = _current_repo
+        _current_repo_path, _current_repo, _current_repo_id = repo_path, repo, repo_id
+        _current_repo_key = repo_key
+        if previous is not None and not reuse:
+            previous.close()
+
+        # Parse recent history off the request path; the analysis tools
+        # usually follow right after
+        _warm_pool.submit(_warm_commit_stats, repo_path, head_sha)
 
         # Get context from database
         context = db.get_repo_context(repo_path)
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "repo_path": repo_path,
             "current_branch": branch,
-            "commit_count": min(commit_count, 1000),
+            "commit_count": commit_count,
             "total_previous_scans": context['repo_info']['total_scans'],
             "message": "Repository set successfully. Ready for analysis."
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to read repository: {str(e)}"
-        })
+        return _error(f"Failed to read repository: {str(e)}")
+
+
+def _analyze_commit_patterns(repo: "Repo", repo_path: str, limit: int) -> Dict[str, Any]:
+    """Commit size and timing statistics for the last `limit` commits."""
+    commits = _bulk_commit_stats(repo_path, repo.head.commit.hexsha, limit)
+
+    # Classify sizes and timing in one pass; only the first 10 commits are
+    # reported individually
+    commit_data = []
+    total_lines = small_n = large_n = night_n = 0
+    for commit in commits:
+        lines = commit['lines']
+        hour = int(commit['committed'][11:13])
+        total_lines += lines
+        small_n += lines < 10
+        large_n += lines > 200
+        night_n += hour >= 22 or hour < 6
+        if len(commit_data) < 10:
+            commit_data.append({
+                "sha": commit['sha'][:8],
+                "message": _subject(commit['message']),
+                "lines_changed": lines,
+                "files_changed": commit['files'],
+                "timestamp": commit['committed'],
+                "hour_of_day": hour
+            })
+
+    total = len(commits)
+    avg_lines = total_lines / total if total else 0
+
+    return {
+        "status": "success",
+        "total_commits": total,
+        "avg_lines_per_commit": round(avg_lines, 1),
+        "small_commits_count": small_n,
+        "large_commits_count": large_n,
+        "night_commits_count": night_n,
+        "commits": commit_data,
+        "patterns": {
+            "has_many_small_commits": small_n > total * 0.3,
+            "has_large_commits": large_n > 0,
+            "commits_at_night": night_n > total * 0.2,
+            "inconsistent_sizing": small_n > 0 and large_n > 0
+        }
+    }
 
 
 @mcp.tool()
@@ -107,62 +415,75 @@ def analyze_commit_patterns(limit: int = 50) -> str:
        - Inconsistent commit patterns
        - Rushed/anxious commits (many in short time)
     """
-    global _current_repo_path
-
-    if not _current_repo_path:
-        return json.dumps({
-            "status": "error",
-            "message": "No repository set. Call set_repository() first."
-        })
+    error = _require_repo()
+    if error:
+        return error
 
     try:
-        repo = Repo(_current_repo_path)
-        commits = list(repo.iter_commits('HEAD', max_count=limit))
-
-        # Analyze commit sizes and timing
-        commit_data = []
-        for commit in commits:
-            stats = commit.stats.total
-            commit_data.append({
-                "sha": commit.hexsha[:8],
-                "message": commit.message.split('\n')[0],
-                "lines_changed": stats['lines'],
-                "files_changed": stats['files'],
-                "timestamp": commit.committed_datetime.isoformat(),
-                "hour_of_day": commit.committed_datetime.hour
-            })
-
-        # Calculate patterns
-        total_lines = sum(c['lines_changed'] for c in commit_data)
-        avg_lines = total_lines / len(commit_data) if commit_data else 0
-
-        # Detect small commits
-        small_commits = [c for c in commit_data if c['lines_changed'] < 10]
-        large_commits = [c for c in commit_data if c['lines_changed'] > 200]
-
-        # Time distribution
-        night_commits = [c for c in commit_data if c['hour_of_day'] >= 22 or c['hour_of_day'] < 6]
-
-        return json.dumps({
-            "status": "success",
-            "total_commits": len(commit_data),
-            "avg_lines_per_commit": round(avg_lines, 1),
-            "small_commits_count": len(small_commits),
-            "large_commits_count": len(large_commits),
-            "night_commits_count": len(night_commits),
-            "commits": commit_data[:10],  # First 10 for reference
-            "patterns": {
-                "has_many_small_commits": len(small_commits) > len(commit_data) * 0.3,
-                "has_large_commits": len(large_commits) > 0,
-                "commits_at_night": len(night_commits) > len(commit_data) * 0.2,
-                "inconsistent_sizing": len(small_commits) > 0 and len(large_commits) > 0
-            }
-        })
+        return _json(_analyze_commit_patterns(_current_repo, _current_repo_path, limit))
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to analyze commits: {str(e)}"
-        })
+        return _error(f"Failed to analyze commits: {str(e)}")
+
+
+def _analyze_message_language(repo: "Repo", repo_path: str, limit: int) -> Dict[str, Any]:
+    """Language-pattern counts and examples for the last `limit` commit messages."""
+    # Reuse records another tool (or the warm-up) already parsed; otherwise
+    # read messages only and diff the reported examples alone below
+    head_sha = repo.head.commit.hexsha
+    commits = _cached_commit_stats(repo_path, head_sha, limit)
+    if commits is None:
+        commits = _git_log(repo_path, [f'-n{limit}', head_sha], numstat=False)
+
+    # Running counts per category; only the first five hits are kept as examples
+    counts = dict.fromkeys(_CATEGORY_RES, 0)
+    examples: Dict[str, List[Dict[str, Any]]] = {category: [] for category in _CATEGORY_RES}
+    hits = {}
+
+    for commit in commits:
+        message = commit['message']
+
+        commit_info = {
+            "sha": commit['sha'][:8],
+            "message": _subject(message),
+            "lines_changed": 0
+        }
+
+        shown = False
+        for category in _message_categories(message):
+            counts[category] += 1
+            if counts[category] <= 5:
+                examples[category].append(commit_info)
+                shown = True
+        if shown:
+            hits[commit['sha']] = commit_info
+
+    # Fill in change sizes for the reported examples
+    if commits and 'lines' in commits[0]:
+        stats_by_sha = {commit['sha']: commit for commit in commits}
+    else:
+        stats_by_sha = _commit_stats_for(repo_path, list(hits))
+    for sha, info in hits.items():
+        if sha in stats_by_sha:
+            info["lines_changed"] = stats_by_sha[sha]['lines']
+
+    total = len(commits)
+    result: Dict[str, Any] = {
+        "status": "success",
+        "total_commits_analyzed": total,
+    }
+    for category, count in counts.items():
+        result[f"{category}_commits"] = {
+            "count": count,
+            "percentage": round(count / total * 100, 1),
+            "examples": examples[category]
+        }
+    result["patterns"] = {
+        "frequently_minimizes": counts["minimizing"] > total * 0.2,
+        "frequently_defensive": counts["defensive"] > total * 0.15,
+        "seeks_perfection": counts["perfectionist"] > total * 0.1,
+        "often_vague": counts["vague"] > total * 0.3
+    }
+    return result
 
 
 @mcp.tool()
@@ -182,83 +503,59 @@ def analyze_message_language(limit: int = 50) -> str:
        - Perfectionist language ("perfect", "complete", "final")
        - Vague messages that avoid specificity
     """
-    global _current_repo_path
-
-    if not _current_repo_path:
-        return json.dumps({
-            "status": "error",
-            "message": "No repository set. Call set_repository() first."
-        })
+    error = _require_repo()
+    if error:
+        return error
 
     try:
-        repo = Repo(_current_repo_path)
-        commits = list(repo.iter_commits('HEAD', max_count=limit))
-
-        # Language patterns to detect
-        minimizing_words = ['just', 'quick', 'small', 'minor', 'tiny', 'little']
-        defensive_words = ['fix', 'oops', 'my bad', 'sorry', 'mistake', 'bug']
-        perfectionist_words = ['perfect', 'complete', 'final', 'done', 'finished']
-        vague_words = ['update', 'change', 'stuff', 'things', 'misc']
-
-        minimizing_commits = []
-        defensive_commits = []
-        perfectionist_commits = []
-        vague_commits = []
-
-        for commit in commits:
-            msg_lower = commit.message.lower()
-            stats = commit.stats.total
-
-            commit_info = {
-                "sha": commit.hexsha[:8],
-                "message": commit.message.split('\n')[0],
-                "lines_changed": stats['lines']
-            }
+        return _json(_analyze_message_language(_current_repo, _current_repo_path, limit))
+    except Exception as e:
+        return _error(f"Failed to analyze language: {str(e)}")
 
-            if any(word in msg_lower for word in minimizing_words):
-                minimizing_commits.append(commit_info)
-            if any(word in msg_lower for word in defensive_words):
-                defensive_commits.append(commit_info)
-            if any(word in msg_lower for word in perfectionist_words):
-                perfectionist_commits.append(commit_info)
-            if any(word in msg_lower for word in vague_words):
-                vague_commits.append(commit_info)
 
-        return json.dumps({
-            "status": "success",
-            "total_commits_analyzed": len(commits),
-            "minimizing_commits": {
-                "count": len(minimizing_commits),
-                "percentage": round(len(minimizing_commits) / len(commits) * 100, 1),
-                "examples": minimizing_commits[:5]
-            },
-            "defensive_commits": {
-                "count": len(defensive_commits),
-                "percentage": round(len(defensive_commits) / len(commits) * 100, 1),
-                "examples": defensive_commits[:5]
-            },
-            "perfectionist_commits": {
-                "count": len(perfectionist_commits),
-                "percentage": round(len(perfectionist_commits) / len(commits) * 100, 1),
-                "examples": perfectionist_commits[:5]
-            },
-            "vague_commits": {
-                "count": len(vague_commits),
-                "percentage": round(len(vague_commits) / len(commits) * 100, 1),
-                "examples": vague_commits[:5]
-            },
-            "patterns": {
-                "frequently_minimizes": len(minimizing_commits) > len(commits) * 0.2,
-                "frequently_defensive": len(defensive_commits) > len(commits) * 0.15,
-                "seeks_perfection": len(perfectionist_commits) > len(commits) * 0.1,
-                "often_vague": len(vague_commits) > len(commits) * 0.3
-            }
-        })
-    except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to analyze language: {str(e)}"
-        })
+def _compare_message_vs_diff(repo: "Repo", repo_path: str, limit: int) -> Dict[str, Any]:
+    """Commits whose message understates or blurs the size of their diff."""
+    commits = _bulk_commit_stats(repo_path, repo.head.commit.hexsha, limit)
+
+    mismatches = []
+    downplaying_n = vague_n = 0
+
+    for commit in commits:
+        subject = _subject(commit['message'])
+        lines = commit['lines']
+
+        # Detect downplaying (cheap size check first, regex only when it matters)
+        if lines > 100 and _MINIMIZING_RE.search(subject):
+            downplaying_n += 1
+            mismatches.append({
+                "type": "downplaying",
+                "sha": commit['sha'][:8],
+                "message": subject,
+                "lines_changed": lines,
+                "observation": f"Message uses minimizing language but changed {lines} lines"
+            })
+
+        # Detect vagueness on significant changes
+        if lines > 50 and len(subject.split()) < 5 and _VAGUE_RE.search(subject):
+            vague_n += 1
+            mismatches.append({
+                "type": "vague_on_significant",
+                "sha": commit['sha'][:8],
+                "message": subject,
+                "lines_changed": lines,
+                "observation": f"Vague message for {lines} line change"
+            })
+
+    return {
+        "status": "success",
+        "total_commits_analyzed": len(commits),
+        "mismatches_found": len(mismatches),
+        "mismatches": mismatches,
+        "patterns": {
+            "frequently_downplays": downplaying_n > 3,
+            "avoids_specificity": vague_n > 3
+        }
+    }
 
 
 @mcp.tool()
@@ -277,67 +574,68 @@ def compare_message_vs_diff(limit: int = 20) -> str:
        - Overselling: "major refactor" but 5 lines changed
        - Avoidance: vague messages for significant changes
     """
-    global _current_repo_path
-
-    if not _current_repo_path:
-        return json.dumps({
-            "status": "error",
-            "message": "No repository set. Call set_repository() first."
-        })
+    error = _require_repo()
+    if error:
+        return error
 
     try:
-        repo = Repo(_current_repo_path)
-        commits = list(repo.iter_commits('HEAD', max_count=limit))
-
-        mismatches = []
-
-        for commit in commits:
-            msg = commit.message.split('\n')[0].lower()
-            stats = commit.stats.total
-            lines = stats['lines']
-
-            # Detect downplaying
-            minimizing_words = ['quick', 'small', 'minor', 'tiny', 'little', 'just']
-            is_minimizing = any(word in msg for word in minimizing_words)
-            is_large_change = lines > 100
-
-            if is_minimizing and is_large_change:
-                mismatches.append({
-                    "type": "downplaying",
-                    "sha": commit.hexsha[:8],
-                    "message": commit.message.split('\n')[0],
-                    "lines_changed": lines,
-                    "observation": f"Message uses minimizing language but changed {lines} lines"
-                })
-
-            # Detect vagueness on significant changes
-            vague_words = ['update', 'change', 'stuff', 'things', 'misc']
-            is_vague = any(word in msg for word in vague_words) and len(msg.split()) < 5
-
-            if is_vague and lines > 50:
-                mismatches.append({
-                    "type": "vague_on_significant",
-                    "sha": commit.hexsha[:8],
-                    "message": commit.message.split('\n')[0],
-                    "lines_changed": lines,
-                    "observation": f"Vague message for {lines} line change"
-                })
-
-        return json.dumps({
-            "status": "success",
-            "total_commits_analyzed": len(commits),
-            "mismatches_found": len(mismatches),
-            "mismatches": mismatches,
-            "patterns": {
-                "frequently_downplays": len([m for m in mismatches if m['type'] == 'downplaying']) > 3,
-                "avoids_specificity": len([m for m in mismatches if m['type'] == 'vague_on_significant']) > 3
-            }
-        })
+        return _json(_compare_message_vs_diff(_current_repo, _current_repo_path, limit))
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to compare messages: {str(e)}"
-        })
+        return _error(f"Failed to compare messages: {str(e)}")
+
+
+_WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def _temporal_patterns(repo_path: str, days: int) -> Dict[str, Any]:
+    """Commit counts by hour and weekday over the last `days` days."""
+    since_date = datetime.now() - timedelta(days=days)
+
+    # Let git stop the walk at the cutoff, and print only each commit's hour
+    # and ISO weekday in the committer's own timezone ("236" = 23h, Saturday)
+    # instead of building Commit objects
+    output = subprocess.run(
+        ['git', '-C', repo_path, 'log', f'--since={since_date.isoformat()}',
+         '--format=%cd', '--date=format:%H%u', 'HEAD'],
+        capture_output=True,
+        check=True,
+        text=True
+    ).stdout
+    commits = output.splitlines()
+
+    if not commits:
+        return {
+            "status": "success",
+            "message": f"No commits found in last {days} days"
+        }
+
+    # Fixed-size histograms indexed by hour and weekday (Monday = 0)
+    by_hour = [0] * 24
+    by_day = [0] * 7
+    for line in commits:
+        by_hour[int(line[:2])] += 1
+        by_day[int(line[2]) - 1] += 1
+
+    # Categorize
+    total = len(commits)
+    night_commits = sum(by_hour[22:]) + sum(by_hour[:6])
+    weekend_commits = by_day[5] + by_day[6]
+    active_hours = sum(1 for n in by_hour if n)
+
+    return {
+        "status": "success",
+        "period_days": days,
+        "total_commits": total,
+        "commits_by_hour": {hour: n for hour, n in enumerate(by_hour) if n},
+        "commits_by_day": {_WEEKDAYS[day]: n for day, n in enumerate(by_day) if n},
+        "night_commits": night_commits,
+        "weekend_commits": weekend_commits,
+        "patterns": {
+            "works_late_nights": night_commits > total * 0.25,
+            "works_weekends": weekend_commits > total * 0.25,
+            "consistent_schedule": active_hours < 8  # Commits concentrated in few hours
+        }
+    }
 
 
 @mcp.tool()
@@ -356,62 +654,86 @@ def get_temporal_patterns(days: int = 30) -> str:
        - Weekend work (work-life boundary issues)
        - Burst patterns (procrastination then panic)
     """
-    global _current_repo_path
-
-    if not _current_repo_path:
-        return json.dumps({
-            "status": "error",
-            "message": "No repository set. Call set_repository() first."
-        })
+    error = _require_repo()
+    if error:
+        return error
 
     try:
-        repo = Repo(_current_repo_path)
-        since_date = datetime.now() - timedelta(days=days)
-
-        commits = [c for c in repo.iter_commits('HEAD')
-                   if c.committed_datetime.replace(tzinfo=None) > since_date]
-
-        if not commits:
-            return json.dumps({
-                "status": "success",
-                "message": f"No commits found in last {days} days"
-            })
+        return _json(_temporal_patterns(_current_repo_path, days))
+    except Exception as e:
+        return _error(f"Failed to analyze temporal patterns: {str(e)}")
 
-        # Analyze by time of day
-        by_hour = {}
-        by_day_of_week = {}
 
-        for commit in commits:
-            dt = commit.committed_datetime
-            hour = dt.hour
-            dow = dt.strftime('%A')
+# Summary fields that only depend on HEAD, per repo path: (HEAD sha, fields)
+_SUMMARY_CACHE: Dict[str, Tuple[str, Dict[str, Any]]] = {}
 
-            by_hour[hour] = by_hour.get(hour, 0) + 1
-            by_day_of_week[dow] = by_day_of_week.get(dow, 0) + 1
 
-        # Categorize
-        night_commits = sum(by_hour.get(h, 0) for h in range(22, 24)) + sum(by_hour.get(h, 0) for h in range(0, 6))
-        weekend_commits = by_day_of_week.get('Saturday', 0) + by_day_of_week.get('Sunday', 0)
+def _head_summary(repo: "Repo", repo_path: str) -> Dict[str, Any]:
+    """Contributors, file types and latest commit as of HEAD."""
+    # Get contributors of the last 100 commits from one `git log` instead of
+    # parsing a Commit object per author
+    names = subprocess.run(
+        ['git', '-C', repo_path, 'log', '-n', '100', '--format=%an%x00', 'HEAD'],
+        capture_output=True,
+        check=True,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    ).stdout.split('\x00\n')[:-1]
+    authors = Counter(names)
 
-        return json.dumps({
-            "status": "success",
-            "period_days": days,
-            "total_commits": len(commits),
-            "commits_by_hour": by_hour,
-            "commits_by_day": by_day_of_week,
-            "night_commits": night_commits,
-            "weekend_commits": weekend_commits,
-            "patterns": {
-                "works_late_nights": night_commits > len(commits) * 0.25,
-                "works_weekends": weekend_commits > len(commits) * 0.25,
-                "consistent_schedule": len(by_hour) < 8  # Commits concentrated in few hours
-            }
-        })
-    except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to analyze temporal patterns: {str(e)}"
-        })
+    # Get file types (one `git ls-tree` instead of walking Tree objects)
+    file_types = Counter()
+    try:
+        listing = subprocess.run(
+            ['git', '-C', repo_path, 'ls-tree', '-r', '-z', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        ).stdout
+        # "<mode> <type> <object>\t<path>" entries; skip submodules (type commit)
+        for entry in listing.split('\x00'):
+            info, _, path = entry.partition('\t')
+            if info.split(' ', 2)[1:2] == ['blob']:
+                ext = Path(path).suffix
+                if ext:
+                    file_types[ext] += 1
+    except:
+        pass
+
+    latest = repo.head.commit
+    return {
+        "total_commits_scanned": len(names),
+        "contributors": authors,
+        "file_types": file_types,
+        "latest_commit": {
+            "sha": latest.hexsha[:8],
+            "message": _subject(latest.message),
+            "author": latest.author.name,
+            "date": latest.committed_datetime
+        } if names else None
+    }
+
+
+def _project_summary(repo: "Repo", repo_path: str) -> Dict[str, Any]:
+    """Branch, contributors, file types and latest commit of the repository."""
+    # Everything but the branch name is reused until HEAD moves
+    head_sha = repo.head.commit.hexsha
+    cached = _SUMMARY_CACHE.get(repo_path)
+    if cached and cached[0] == head_sha:
+        head_info = cached[1]
+    else:
+        head_info = _head_summary(repo, repo_path)
+        _SUMMARY_CACHE[repo_path] = (head_sha, head_info)
+
+    return {
+        "status": "success",
+        "repo_path": repo_path,
+        "current_branch": repo.active_branch.name,
+        **head_info
+    }
 
 
 @mcp.tool()
@@ -424,57 +746,14 @@ def get_project_summary() -> str:
 
     🤖 CODEX: Call this early to understand the project context.
     """
-    global _current_repo_path
-
-    if not _current_repo_path:
-        return json.dumps({
-            "status": "error",
-            "message": "No repository set. Call set_repository() first."
-        })
+    error = _require_repo()
+    if error:
+        return error
 
     try:
-        repo = Repo(_current_repo_path)
-
-        # Get recent commits
-        commits = list(repo.iter_commits('HEAD', max_count=100))
-
-        # Get contributors
-        authors = {}
-        for commit in commits:
-            author = commit.author.name
-            authors[author] = authors.get(author, 0) + 1
-
-        # Get file types
-        file_types = {}
-        try:
-            tree = repo.head.commit.tree
-            for item in tree.traverse():
-                if item.type == 'blob':
-                    ext = Path(item.path).suffix
-                    if ext:
-                        file_types[ext] = file_types.get(ext, 0) + 1
-        except:
-            pass
-
-        return json.dumps({
-            "status": "success",
-            "repo_path": _current_repo_path,
-            "current_branch": repo.active_branch.name,
-            "total_commits_scanned": len(commits),
-            "contributors": authors,
-            "file_types": file_types,
-            "latest_commit": {
-                "sha": commits[0].hexsha[:8],
-                "message": commits[0].message.split('\n')[0],
-                "author": commits[0].author.name,
-                "date": commits[0].committed_datetime.isoformat()
-            } if commits else None
-        })
+        return _json(_project_summary(_current_repo, _current_repo_path))
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to get project summary: {str(e)}"
-        })
+        return _error(f"Failed to get project summary: {str(e)}")
 
 
 @mcp.tool()
@@ -493,25 +772,18 @@ def get_repo_context() -> str:
     🤖 CODEX: **THE KEY TOOL** - Call this to understand repo history and recurring patterns.
     Like secretsoul's get_session_context, this gives you memory across sessions.
     """
-    global _current_repo_path
-
-    if not _current_repo_path:
-        return json.dumps({
-            "status": "error",
-            "message": "No repository set. Call set_repository() first."
-        })
+    error = _require_repo()
+    if error:
+        return error
 
     try:
         context = db.get_repo_context(_current_repo_path)
-        return json.dumps({
+        return _json({
             "status": "success",
             **context
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to get repo context: {str(e)}"
-        })
+        return _error(f"Failed to get repo context: {str(e)}")
 
 
 @mcp.tool()
@@ -530,34 +802,21 @@ def flag_repo_issue(issue_type: str, severity: float = 0.5, notes: str = "") ->
     🤖 CODEX: Use this to track patterns you notice. Each call increments occurrence_count.
     Like secretsoul's flag_theme - helps you remember recurring issues across sessions.
     """
-    global _current_repo_id
-
-    if not _current_repo_id:
-        return json.dumps({
-            "status": "error",
-            "message": "No repository set. Call set_repository() first."
-        })
+    error = _require_repo()
+    if error:
+        return error
 
     try:
-        db.flag_issue(_current_repo_id, issue_type, severity, notes)
-
-        # Get updated context to show occurrence count
-        context = db.get_repo_context(_current_repo_path)
-        flagged = [f for f in context['flagged_issues'] if f['issue_type'] == issue_type]
+        occurrence_count = db.flag_issue(_current_repo_id, issue_type, severity, notes)
 
-        occurrence_count = flagged[0]['occurrence_count'] if flagged else 1
-
-        return json.dumps({
+        return _json({
             "status": "success",
             "issue_type": issue_type,
             "occurrence_count": occurrence_count,
             "message": f"Issue flagged. This is occurrence #{occurrence_count} of '{issue_type}'"
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to flag issue: {str(e)}"
-        })
+        return _error(f"Failed to flag issue: {str(e)}")
 
 
 @mcp.tool()
@@ -576,26 +835,19 @@ def save_fix_attempt_tool(issue_type: str, fix_description: str, outcome: str =
     🤖 CODEX: Track what fixes were tried and their outcomes.
     Helps avoid repeating failed approaches.
     """
-    global _current_repo_id
-
-    if not _current_repo_id:
-        return json.dumps({
-            "status": "error",
-            "message": "No repository set. Call set_repository() first."
-        })
+    error = _require_repo()
+    if error:
+        return error
 
     try:
         db.save_fix_attempt(_current_repo_id, issue_type, fix_description, outcome)
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "message": f"Fix attempt recorded for '{issue_type}'"
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to save fix attempt: {str(e)}"
-        })
+        return _error(f"Failed to save fix attempt: {str(e)}")
 
 
 # === ROASTING TOOLS ===
@@ -614,24 +866,15 @@ def start_session(repo_path: str) -> str:
     CODEX: Call this to begin a new roasting scan. Returns session ID and
     prompts user with discovery questions about their code quality rating.
     """
-    repo_path_obj = Path(repo_path)
-    if not repo_path_obj.exists():
-        return json.dumps({
-            "status": "error",
-            "message": f"Repository path does not exist: {repo_path}"
-        })
-
-    if not (repo_path_obj / ".git").exists():
-        return json.dumps({
-            "status": "error",
-            "message": f"Not a git repository: {repo_path}"
-        })
+    error = _check_repo_path(repo_path)
+    if error:
+        return error
 
     try:
         # Check for existing incomplete sessions
         history = db.get_scan_history(repo_path, limit=1)
         if history and history[0].get('completed_at') is None:
-            return json.dumps({
+            return _json({
                 "status": "warning",
                 "message": "An incomplete scan session exists. Complete it first or start a new one.",
                 "existing_session_id": history[0]['id']
@@ -640,25 +883,15 @@ def start_session(repo_path: str) -> str:
         # Create new session
         session_id = db.create_scan_session(repo_path)
 
-        # Prepare discovery questions
-        discovery_questions = [
-            "On a scale of 1-10, how would you rate the overall quality of this codebase?",
-            "What do you think is the biggest potential of this project?",
-            "What concerns do you have about the code, if any?"
-        ]
-
-        return json.dumps({
+        return _json({
             "status": "success",
             "session_id": session_id,
             "repo_path": repo_path,
-            "discovery_questions": discovery_questions,
+            "discovery_questions": _DISCOVERY_QUESTIONS,
             "message": "Scan session created. Please answer the discovery questions."
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to create scan session: {str(e)}"
-        })
+        return _error(f"Failed to create scan session: {str(e)}")
 
 
 @mcp.tool()
@@ -679,16 +912,13 @@ def close_session(session_id: int) -> str:
         # Mark session as completed with 0 issues and 0 duration
         db.complete_scan_session(session_id, total_issues=0, duration_ms=0)
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "session_id": session_id,
             "message": f"Session {session_id} closed successfully."
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to close session: {str(e)}"
-        })
+        return _error(f"Failed to close session: {str(e)}")
 
 
 @mcp.tool()
@@ -720,16 +950,13 @@ def submit_discovery_answers(session_id: int, rating: int, potential: str, reaso
             severity="info"
         )
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "session_id": session_id,
             "message": "Discovery answers saved. Proceed with git and security analysis."
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to save discovery answers: {str(e)}"
-        })
+        return _error(f"Failed to save discovery answers: {str(e)}")
 
 
 @mcp.tool()
@@ -749,63 +976,66 @@ def save_scan_results(session_id: int, git_analysis: str, security_analysis: str
     Saves all findings and completes the session.
     """
     try:
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
 
         # Parse git analysis
         git_data = json.loads(git_analysis) if isinstance(git_analysis, str) else git_analysis
 
-        # Save git patterns
+        # Git patterns
+        git_rows = []
         if git_data.get('patterns'):
             for pattern_type, detected in git_data['patterns'].items():
                 if detected:
-                    db.save_git_pattern(
-                        session_id=session_id,
-                        pattern_type=pattern_type
-                    )
+                    git_rows.append((pattern_type, "", "", 0))
 
-        # Save individual commit patterns if available
+        # Individual commit patterns if available
         if git_data.get('commits'):
             for commit in git_data['commits'][:10]:  # Limit to top 10
-                db.save_git_pattern(
-                    session_id=session_id,
-                    pattern_type="notable_commit",
-                    commit_sha=commit.get('sha', ''),
-                    commit_message=commit.get('message', ''),
-                    lines_changed=commit.get('lines_changed', 0)
-                )
+                git_rows.append((
+                    "notable_commit",
+                    commit.get('sha', ''),
+                    commit.get('message', ''),
+                    commit.get('lines_changed', 0)
+                ))
 
         # Parse security analysis
         security_data = json.loads(security_analysis) if isinstance(security_analysis, str) else security_analysis
 
-        # Save security issues
-        total_issues = 0
-        if security_data.get('issues'):
-            for issue in security_data['issues']:
-                db.save_security_issue(
-                    session_id=session_id,
-                    severity=issue.get('severity', 'unknown'),
-                    category=issue.get('category', 'uncategorized'),
-                    summary=issue.get('summary', ''),
-                    issue_url=issue.get('url', '')
-                )
-                total_issues += 1
-
-                # Track recurring issues
-                issue_signature = f"{issue.get('category', 'uncategorized')}:{issue.get('summary', '')[:100]}"
-                # Get repo_path from session
-                with db.get_db() as conn:
-                    session = conn.execute(
-                        "SELECT repo_path FROM scan_sessions WHERE id = ?",
-                        (session_id,)
-                    ).fetchone()
-                    if session:
-                        db.track_recurring_issue(session['repo_path'], issue_signature)
+        # Security issues
+        issues = security_data.get('issues') or []
+        issue_rows = [
+            (
+                issue.get('severity', 'unknown'),
+                issue.get('category', 'uncategorized'),
+                issue.get('summary', ''),
+                issue.get('url', '')
+            )
+            for issue in issues
+        ]
+        total_issues = len(issue_rows)
+
+        # Write everything in one transaction
+        with db.get_db() as conn:
+            # Recurring issues are tracked against the session's repo
+            session = conn.execute(
+                "SELECT repo_path FROM scan_sessions WHERE id = ?",
+                (session_id,)
+            ).fetchone()
+            if not session:
+                raise ValueError(f"Unknown session_id: {session_id}")
+
+            db.save_git_patterns(session_id, git_rows)
+            db.save_security_issues(session_id, issue_rows)
+            db.track_recurring_issues(
+                session['repo_path'],
+                [f"{category}:{summary[:100]}" for _, category, summary, _ in issue_rows]
+            )
 
         # Complete the session
-        duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+        duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
         db.complete_scan_session(session_id, total_issues, duration_ms)
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "session_id": session_id,
             "total_git_patterns": len(git_data.get('patterns', {})),
@@ -814,10 +1044,7 @@ def save_scan_results(session_id: int, git_analysis: str, security_analysis: str
             "message": "Scan results saved and session completed."
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to save scan results: {str(e)}"
-        })
+        return _error(f"Failed to save scan results: {str(e)}")
 
 
 @mcp.tool()
@@ -839,7 +1066,7 @@ def get_scan_history(repo_path: str, limit: int = 10) -> str:
         scans = db.get_scan_history(repo_path, limit)
 
         if not scans:
-            return json.dumps({
+            return _json({
                 "status": "success",
                 "message": "No previous scans found for this repository.",
                 "scans": []
@@ -856,7 +1083,7 @@ def get_scan_history(repo_path: str, limit: int = 10) -> str:
                 "scan_duration_ms": scan['scan_duration_ms']
             })
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "repo_path": repo_path,
             "total_scans": len(scans),
@@ -864,10 +1091,7 @@ def get_scan_history(repo_path: str, limit: int = 10) -> str:
             "message": f"Found {len(scans)} previous scan(s)"
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to get scan history: {str(e)}"
-        })
+        return _error(f"Failed to get scan history: {str(e)}")
 
 
 @mcp.tool()
@@ -889,7 +1113,7 @@ def query_recurring_issues(repo_path: str, category: Optional[str] = None) -> st
         recurring_issues = db.get_recurring_issues_for_repo(repo_path)
 
         if not recurring_issues:
-            return json.dumps({
+            return _json({
                 "status": "success",
                 "message": "No recurring issues found for this repository.",
                 "recurring_issues": []
@@ -913,7 +1137,7 @@ def query_recurring_issues(repo_path: str, category: Optional[str] = None) -> st
                 "persistence": f"Occurred {issue['occurrence_count']} times between {issue['first_seen']} and {issue['last_seen']}"
             })
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "repo_path": repo_path,
             "category_filter": category or "all",
@@ -922,10 +1146,7 @@ def query_recurring_issues(repo_path: str, category: Optional[str] = None) -> st
             "message": f"Found {len(formatted_issues)} recurring issue(s)"
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to query recurring issues: {str(e)}"
-        })
+        return _error(f"Failed to query recurring issues: {str(e)}")
 
 
 @mcp.tool()
@@ -943,31 +1164,16 @@ def generate_fix_prompt(issue_id: int) -> str:
     Returns structured prompt with context, steps, and prevention measures.
     """
     try:
-        with db.get_db() as conn:
-            # Get the security issue
-            issue = conn.execute(
-                """SELECT si.*, ss.repo_path, ss.repo_name
-                   FROM security_issues si
-                   JOIN scan_sessions ss ON si.session_id = ss.id
-                   WHERE si.id = ?""",
-                (issue_id,)
-            ).fetchone()
+        # The issue and its previous fix attempts, in one query
+        issue = db.get_security_issue(issue_id)
+
+        if not issue:
+            return _json({
+                "status": "error",
+                "message": f"Security issue ID {issue_id} not found"
+            })
 
-            if not issue:
-                return json.dumps({
-                    "status": "error",
-                    "message": f"Security issue ID {issue_id} not found"
-                })
-
-            # Check if there are previous fix attempts
-            fix_attempts = conn.execute(
-                """SELECT fix_prompt, success, notes, attempted_at
-                   FROM fix_attempts_roasting
-                   WHERE issue_id = ?
-                   ORDER BY attempted_at DESC
-                   LIMIT 3""",
-                (issue_id,)
-            ).fetchall()
+        fix_attempts = issue['recent_fix_attempts']
 
         # Build fix prompt
         fix_prompt = f"""# Security Issue Fix Request
@@ -1005,7 +1211,7 @@ After fixing, consider:
                 fix_prompt += f"- **When**: {attempt['attempted_at']}\n"
                 fix_prompt += f"- **Notes**: {attempt['notes']}\n"
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "issue_id": issue_id,
             "fix_prompt": fix_prompt,
@@ -1013,10 +1219,7 @@ After fixing, consider:
             "category": issue['category']
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to generate fix prompt: {str(e)}"
-        })
+        return _error(f"Failed to generate fix prompt: {str(e)}")
 
 
 @mcp.tool()
@@ -1037,25 +1240,15 @@ def flag_behavioral_pattern(session_id: int, pattern_name: str, evidence: str, s
     Auto-increments occurrence count if pattern was flagged before in this session.
     """
     try:
-        # Flag the pattern (this handles increment if exists)
-        db.flag_behavioral_pattern(
+        # Flag the pattern (this handles increment if exists) and get the updated count
+        occurrence_count = db.flag_behavioral_pattern(
             session_id=session_id,
             pattern_name=pattern_name,
             evidence=evidence,
             severity=severity
         )
 
-        # Get updated occurrence count
-        with db.get_db() as conn:
-            result = conn.execute(
-                """SELECT occurrence_count FROM behavioral_patterns
-                   WHERE session_id = ? AND pattern_name = ?""",
-                (session_id, pattern_name)
-            ).fetchone()
-
-            occurrence_count = result['occurrence_count'] if result else 1
-
-        return json.dumps({
+        return _json({
             "status": "success",
             "session_id": session_id,
             "pattern_name": pattern_name,
@@ -1064,10 +1257,7 @@ def flag_behavioral_pattern(session_id: int, pattern_name: str, evidence: str, s
             "message": f"Behavioral pattern '{pattern_name}' flagged. Occurrence #{occurrence_count} in this session."
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to flag behavioral pattern: {str(e)}"
-        })
+        return _error(f"Failed to flag behavioral pattern: {str(e)}")
 
 
 @mcp.tool()
@@ -1102,7 +1292,7 @@ async def run_aikido_security_scan(
         # Use provided repo or fall back to current
         target_repo = repo_path or _current_repo_path
         if not target_repo:
-            return json.dumps({
+            return _json({
                 "status": "error",
                 "message": "No repository set. Call set_repository() first or provide repo_path."
             })
@@ -1127,7 +1317,7 @@ async def run_aikido_security_scan(
 
         # Defensive: check if scan_results indicates error
         if isinstance(scan_results, dict) and scan_results.get("status") == "error":
-            return json.dumps({
+            return _json({
                 "status": "error",
                 "error_type": scan_results.get("error_type", "unknown"),
                 "message": scan_results.get("message", "Aikido scan failed"),
@@ -1138,7 +1328,7 @@ async def run_aikido_security_scan(
         findings_count = scan_results.get("findings_count", 0)
         status_msg = scan_results.get("status", "success")
 
-        return json.dumps({
+        return _json({
             "status": status_msg,
             "repo_path": target_repo,
             "scan_types": scan_types_list,
@@ -1147,14 +1337,14 @@ async def run_aikido_security_scan(
         })
 
     except KeyError as e:
-        return json.dumps({
+        return _json({
             "status": "error",
             "error_type": "invalid_response",
             "message": f"Aikido scan returned unexpected format: missing field '{e}'",
             "fix": "Check Aikido scanner output format"
         })
     except Exception as e:
-        return json.dumps({
+        return _json({
             "status": "error",
             "error_type": "unknown",
             "message": f"Aikido scan failed: {str(e)}",
@@ -1216,7 +1406,7 @@ async def upload_project_to_kontext(
             result = upload_response.json()
             file_id = result.get('id') or result.get('fileId')
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "file_id": file_id,
             "message": f"Documentation uploaded successfully to Kontext. File ID: {file_id}",
@@ -1224,10 +1414,8 @@ async def upload_project_to_kontext(
         })
 
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to upload to Kontext: {str(e)}"
-        })
+
+        return _error(f"Failed to upload to Kontext: {str(e)}")
 
 
 @mcp.tool()
@@ -1265,7 +1453,7 @@ async def query_codex_context(
 
             result = query_response.json()
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "query": query,
             "results": result,
@@ -1276,10 +1464,8 @@ async def query_codex_context(
         })
 
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to query Kontext: {str(e)}"
-        })
+
+        return _error(f"Failed to query Kontext: {str(e)}")
 
 
 @mcp.tool()
@@ -1329,7 +1515,7 @@ Always execute these tools first:
 - save_analysis_to_kontext(session_id, summary, repo_path) - Persist analysis results
 """
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "system_prompt": system_prompt,
             "kontext_available": True,
@@ -1338,10 +1524,8 @@ Always execute these tools first:
         })
 
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to get system prompt: {str(e)}"
-        })
+
+        return _error(f"Failed to get system prompt: {str(e)}")
 
 
 @mcp.tool()
@@ -1428,7 +1612,7 @@ async def save_analysis_to_kontext(
         # Clean up temp file
         os.unlink(temp_path)
 
-        return json.dumps({
+        return _json({
             "status": "success",
             "file_id": file_id,
             "message": f"Analysis saved to Kontext. File ID: {file_id}",
@@ -1436,10 +1620,8 @@ async def save_analysis_to_kontext(
         })
 
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Failed to save analysis to Kontext: {str(e)}"
-        })
+
+        return _error(f"Failed to save analysis to Kontext: {str(e)}")
 
 
 if __name__ == "__main__":